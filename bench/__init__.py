@@ -0,0 +1,6 @@
+"""Benchmarks for core blockchain operations.
+
+Run from the repository root:
+
+    python -m bench.run --out results.json
+"""
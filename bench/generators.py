@@ -0,0 +1,64 @@
+"""Synthetic data for the benchmarks, backed by a throwaway SQLite store"""
+import os
+import random
+import tempfile
+import time
+from blockchain import Blockchain
+from storage import SQLiteChainStore
+from wallet import Wallet
+
+
+def random_address(rng):
+    return '%032x' % rng.getrandbits(128)
+
+
+def temp_blockchain(parent=None):
+    """A Blockchain on a fresh SQLite file under ``parent`` with only the genesis block"""
+    directory = tempfile.mkdtemp(prefix='chain-', dir=parent)
+    store = SQLiteChainStore(os.path.join(directory, 'chain.db'))
+    return Blockchain(store=store, archive=None)
+
+
+def synthetic_transactions(count, addresses, rng):
+    """Unsigned transfers between ``addresses``; only the fields stored in blocks"""
+    return [
+        {
+            'sender': rng.choice(addresses),
+            'recipient': rng.choice(addresses),
+            'amount': float(rng.randint(1, 1000)) / 100
+        } for _ in range(count)
+    ]
+
+
+def queue_transactions(blockchain, transactions):
+    """Put synthetic transactions straight into the mempool, skipping admission checks"""
+    for tx in transactions:
+        tx = dict(tx, timestamp=time.time(), signature=None, public_key=None)
+        tx['txid'] = Blockchain.transaction_id(tx)
+        blockchain.store.add_transaction(tx)
+
+
+def fill_chain(blockchain, height, txs_per_block, addresses, seed=0, valid=False):
+    """Grow ``blockchain`` to ``height`` blocks of synthetic transactions.
+
+    With ``valid=True`` each block carries a real proof of work so the chain
+    passes ``is_chain_valid``; otherwise proofs are skipped for speed.
+    """
+    rng = random.Random(seed)
+    while blockchain.chain_length < height:
+        last_block = blockchain.get_last_block()
+        proof = blockchain.proof_of_work(last_block) if valid else 0
+        queue_transactions(blockchain, synthetic_transactions(txs_per_block, addresses, rng))
+        blockchain.create_block(proof, blockchain.hash(last_block))
+    return blockchain
+
+
+def signed_transaction(wallet, recipient, amount):
+    """A transaction signed by ``wallet`` in the shape /transactions/new expects"""
+    return wallet.create_transaction(recipient, amount)
+
+
+def wallets(count, scheme=None):
+    if scheme and scheme != 'rsa-pss':
+        return [Wallet(scheme=scheme) for _ in range(count)]
+    return [Wallet.from_pool() for _ in range(count)]
@@ -0,0 +1,203 @@
+"""Open-loop load generator for /transactions/new and /mine.
+
+Pre-generates wallets, funds each one with mining rewards, pre-signs the
+workload, then fires transactions on a fixed schedule regardless of how
+fast the nodes answer. Latency is measured from each request's scheduled
+send time, so a backed-up node shows up as latency instead of a lower
+offered rate.
+
+    python -m bench.load --nodes http://localhost:5000,http://localhost:5001 \\
+        --wallets 20 --rate 50 --duration 30 --concurrency 32 --mine-interval 5
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from peer_client import PeerClient
+from bench import generators
+from bench.run import summarize
+
+
+class Recorder:
+    """Thread-safe latency and outcome tally for one operation"""
+
+    def __init__(self):
+        self.samples = []
+        self.statuses = {}
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, status):
+        with self._lock:
+            self.samples.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors += 1
+
+    def report(self, elapsed):
+        with self._lock:
+            samples = list(self.samples)
+            statuses = dict(self.statuses)
+            errors = self.errors
+        result = summarize(samples) if samples else {'runs': 0}
+        result.update({
+            'ok': len(samples) - errors,
+            'errors': errors,
+            'statuses': {str(status): count for status, count in statuses.items()},
+            'throughput_per_sec': (len(samples) - errors) / elapsed if elapsed else 0
+        })
+        return result
+
+
+class LoadGenerator:
+    def __init__(self, nodes, concurrency=16, timeout=30):
+        self.nodes = [node.rstrip('/') for node in nodes]
+        self.client = PeerClient(timeout=timeout, retries=0, pool_maxsize=concurrency)
+        self.concurrency = concurrency
+
+    def mine(self, node, address):
+        response = self.client.get(f"{node}/mine", headers={'X-Node-Identifier': address}, timeout=120)
+        return response.status_code
+
+    def fund(self, wallets, blocks_per_wallet):
+        """Mine ``blocks_per_wallet`` rewards for every wallet, one miner per node"""
+        print(f"Funding {len(wallets)} wallets with {blocks_per_wallet} block rewards each...",
+              file=sys.stderr)
+        jobs = [wallet.address for wallet in wallets for _ in range(blocks_per_wallet)]
+
+        def mine_on(node, addresses):
+            for address in addresses:
+                self.mine(node, address)
+
+        threads = [
+            threading.Thread(target=mine_on, args=(node, jobs[i::len(self.nodes)]))
+            for i, node in enumerate(self.nodes)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def wait_for_sync(self, timeout=30):
+        """Wait until every node reports the same chain height"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            heights = set()
+            for node in self.nodes:
+                try:
+                    heights.add(self.client.get(f"{node}/chain/head", timeout=5).json()['length'])
+                except Exception:
+                    heights.add(None)
+            if len(heights) == 1 and None not in heights:
+                return heights.pop()
+            time.sleep(0.5)
+        return None
+
+    def build_workload(self, wallets, count, amount, seed=0):
+        """Pre-sign ``count`` transfers between random wallet pairs"""
+        rng = random.Random(seed)
+        workload = []
+        for _ in range(count):
+            sender, recipient = rng.sample(wallets, 2)
+            workload.append(generators.signed_transaction(sender, recipient.address, amount))
+        return workload
+
+    def submit(self, node, transaction, scheduled, recorder):
+        try:
+            status = self.client.post(f"{node}/transactions/new", json=transaction).status_code
+        except Exception as e:
+            status = type(e).__name__
+        recorder.record(time.perf_counter() - scheduled, status)
+
+    def run(self, workload, rate, mine_interval=0):
+        """Send ``workload`` at ``rate`` per second (open loop) and return the report"""
+        transactions = Recorder()
+        mining = Recorder()
+        stop = threading.Event()
+
+        def miner():
+            i = 0
+            while not stop.wait(mine_interval):
+                node = self.nodes[i % len(self.nodes)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    status = self.mine(node, 'load-generator')
+                except Exception as e:
+                    status = type(e).__name__
+                mining.record(time.perf_counter() - started, status)
+
+        mining_thread = None
+        if mine_interval > 0:
+            mining_thread = threading.Thread(target=miner, daemon=True)
+            mining_thread.start()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for i, transaction in enumerate(workload):
+                scheduled = started + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                node = self.nodes[i % len(self.nodes)]
+                executor.submit(self.submit, node, transaction, scheduled, transactions)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        if mining_thread is not None:
+            mining_thread.join()
+
+        return {
+            'offered_rate': rate,
+            'elapsed_sec': elapsed,
+            'transactions': transactions.report(elapsed),
+            'mining': mining.report(elapsed)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive transaction load against local nodes')
+    parser.add_argument('--nodes', default='http://localhost:5000', help='Comma-separated node URLs')
+    parser.add_argument('--wallets', type=int, default=10, help='Number of wallets to generate')
+    parser.add_argument('--fund-blocks', type=int, default=1, help='Block rewards mined per wallet')
+    parser.add_argument('--rate', type=float, default=20, help='Offered transactions per second')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load')
+    parser.add_argument('--concurrency', type=int, default=16, help='Maximum requests in flight')
+    parser.add_argument('--mine-interval', type=float, default=0,
+                        help='Seconds between /mine calls during the run (0 disables)')
+    parser.add_argument('--amount', type=float, default=0.01, help='Amount per transfer')
+    parser.add_argument('--out', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    if args.wallets < 2:
+        parser.error('--wallets must be at least 2')
+
+    load = LoadGenerator(args.nodes.split(','), concurrency=args.concurrency)
+
+    print(f"Generating {args.wallets} wallets...", file=sys.stderr)
+    wallets = generators.wallets(args.wallets)
+    load.fund(wallets, args.fund_blocks)
+    height = load.wait_for_sync()
+    if height is None:
+        print("Nodes did not converge; balances may differ between nodes", file=sys.stderr)
+
+    count = int(args.rate * args.duration)
+    print(f"Signing {count} transactions...", file=sys.stderr)
+    workload = load.build_workload(wallets, count, args.amount)
+
+    print(f"Offering {args.rate}/s for {args.duration}s to {len(load.nodes)} nodes...", file=sys.stderr)
+    report = load.run(workload, args.rate, args.mine_interval)
+    report.update({'nodes': load.nodes, 'wallets': args.wallets, 'concurrency': args.concurrency})
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
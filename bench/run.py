@@ -0,0 +1,232 @@
+"""Run the benchmark suite and write the results as JSON.
+
+    python -m bench.run                       # print results
+    python -m bench.run --out results.json    # save for comparison
+    python -m bench.run --quick --only pow,verify
+"""
+import argparse
+import gzip
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from blockchain import Blockchain
+import wire
+from bench import generators
+
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'mean_ms': statistics.mean(ordered) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        'min_ms': ordered[0] * 1000
+    }
+
+
+def time_calls(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_valid_proof(args):
+    last_hash = Blockchain.hash({'index': 1, 'proof': 100})
+    count = args.hashes
+    started = time.perf_counter()
+    for proof in range(count):
+        Blockchain.valid_proof(100, proof, last_hash)
+    elapsed = time.perf_counter() - started
+    return {'hashes': count, 'seconds': elapsed, 'hashes_per_sec': count / elapsed}
+
+
+def bench_proof_of_work(args):
+    blockchain = generators.temp_blockchain(args.workdir)
+    hashes = 0
+    samples = []
+    for _ in range(args.pow_rounds):
+        last_block = blockchain.get_last_block()
+        started = time.perf_counter()
+        proof = blockchain.proof_of_work(last_block)
+        samples.append(time.perf_counter() - started)
+        hashes += proof + 1
+        blockchain.create_block(proof, blockchain.hash(last_block))
+    result = summarize(samples)
+    result['hashes_per_sec'] = hashes / sum(samples)
+    return result
+
+
+def bench_verify(args):
+    wallet, recipient = generators.wallets(2, args.scheme)
+    transaction = generators.signed_transaction(wallet, recipient.address, 1.5)
+    signature, public_key = transaction['signature'], transaction['public_key']
+    samples = time_calls(lambda: Blockchain.verify_transaction(transaction, signature, public_key),
+                         args.verifications)
+    result = summarize(samples)
+    result['verifications_per_sec'] = len(samples) / sum(samples)
+    result['scheme'] = wallet.scheme.name
+    return result
+
+
+def bench_balance(args):
+    rng = random.Random(1)
+    addresses = [generators.random_address(rng) for _ in range(args.addresses)]
+    blockchain = generators.temp_blockchain(args.workdir)
+    results = []
+    for height in args.heights:
+        generators.fill_chain(blockchain, height, args.txs_per_block, addresses, seed=height)
+        samples = time_calls(lambda: blockchain.get_balance(rng.choice(addresses)), args.runs)
+        results.append(dict(summarize(samples), height=height,
+                            transactions=height * args.txs_per_block))
+    return results
+
+
+def bench_create_block(args):
+    rng = random.Random(2)
+    addresses = [generators.random_address(rng) for _ in range(args.addresses)]
+    blockchain = generators.temp_blockchain(args.workdir)
+    results = []
+    for size in args.block_sizes:
+        samples = []
+        for _ in range(args.runs):
+            generators.queue_transactions(blockchain, generators.synthetic_transactions(size, addresses, rng))
+            last_block = blockchain.get_last_block()
+            previous_hash = blockchain.hash(last_block)
+            started = time.perf_counter()
+            blockchain.create_block(0, previous_hash)
+            samples.append(time.perf_counter() - started)
+        results.append(dict(summarize(samples), transactions=size))
+    return results
+
+
+def _valid_chain(args):
+    rng = random.Random(3)
+    addresses = [generators.random_address(rng) for _ in range(args.addresses)]
+    blockchain = generators.temp_blockchain(args.workdir)
+    generators.fill_chain(blockchain, args.valid_height, args.txs_per_block, addresses, valid=True)
+    return blockchain.get_chain()
+
+
+def bench_chain_valid(args, chain):
+    blockchain = generators.temp_blockchain(args.workdir)
+    samples = time_calls(lambda: blockchain.is_chain_valid(chain), args.runs)
+    result = summarize(samples)
+    result['blocks'] = len(chain)
+    result['blocks_per_sec'] = len(chain) * len(samples) / sum(samples)
+    return result
+
+
+def bench_serialization(args, chain):
+    """Encode the ``/chain`` response body the way node.py does for each format"""
+    formats = {
+        'json': lambda: json.dumps({'chain': chain, 'length': len(chain)}).encode(),
+        'json_gzip': lambda: gzip.compress(json.dumps({'chain': chain, 'length': len(chain)}).encode(),
+                                           compresslevel=5),
+        'binary': lambda: wire.encode_chain(chain)
+    }
+    results = {}
+    for name, encode in formats.items():
+        samples = time_calls(encode, args.runs)
+        results[name] = dict(summarize(samples), bytes=len(encode()))
+    results['blocks'] = len(chain)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+BENCHMARKS = ['valid_proof', 'pow', 'verify', 'balance', 'create_block', 'chain_valid', 'serialize']
+
+
+def run(args):
+    only = set(args.only.split(',')) if args.only else set(BENCHMARKS)
+    results = {}
+    chain = None
+    for name in BENCHMARKS:
+        if name not in only:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        if name == 'valid_proof':
+            results[name] = bench_valid_proof(args)
+        elif name == 'pow':
+            results[name] = bench_proof_of_work(args)
+        elif name == 'verify':
+            results[name] = bench_verify(args)
+        elif name == 'balance':
+            results[name] = bench_balance(args)
+        elif name == 'create_block':
+            results[name] = bench_create_block(args)
+        else:
+            chain = chain or _valid_chain(args)
+            if name == 'chain_valid':
+                results[name] = bench_chain_valid(args, chain)
+            else:
+                results[name] = bench_serialization(args, chain)
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': args.quick
+        },
+        'results': results
+    }
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark core blockchain operations')
+    parser.add_argument('--out', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--only', help=f"Comma-separated subset of: {','.join(BENCHMARKS)}")
+    parser.add_argument('--quick', action='store_true', help='Small sizes for a fast smoke run')
+    parser.add_argument('--heights', type=parse_sizes, help='Chain heights for get_balance')
+    parser.add_argument('--block-sizes', type=parse_sizes, help='Transactions per block for create_block')
+    parser.add_argument('--txs-per-block', type=int, default=10)
+    parser.add_argument('--addresses', type=int, default=100)
+    parser.add_argument('--runs', type=int, help='Timed runs per measurement')
+    parser.add_argument('--scheme', default='rsa-pss', help='Signature scheme for the verify benchmark')
+    args = parser.parse_args()
+
+    quick = args.quick
+    args.heights = args.heights or ([10, 100] if quick else [10, 100, 1000, 5000])
+    args.block_sizes = args.block_sizes or ([1, 10, 100] if quick else [1, 10, 100, 1000])
+    args.runs = args.runs or (20 if quick else 100)
+    args.hashes = 20000 if quick else 200000
+    args.pow_rounds = 3 if quick else 20
+    args.verifications = 50 if quick else 500
+    args.valid_height = 10 if quick else 100
+
+    with tempfile.TemporaryDirectory(prefix='bench-') as args.workdir:
+        report = run(args)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
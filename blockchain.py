@@ -1,144 +1,371 @@
 import hashlib
 import json
+import logging
+import os
+import threading
 from time import time
 from urllib.parse import urlparse
-import requests
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding, rsa
-from cryptography.exceptions import InvalidSignature
-from models import Block, Transaction, Node, init_db
+from storage import open_store, StaleBlockError
+from gossip import SeenCache
+from blockfile import BlockFile
+import wire
+import peer_client
 from datetime import datetime
-from cryptography.hazmat.primitives import serialization
 from wallet import Wallet
+from metrics import REGISTRY
+from chainlog import get_logger
+import profiling
+import signatures
+import units
+
+logger = get_logger('chain')
+
+POW_HASHES = REGISTRY.counter('blockchain_pow_hashes_total', 'Proof-of-work hashes computed')
+POW_SECONDS = REGISTRY.histogram('blockchain_pow_seconds', 'Time to find a proof per block',
+                                 buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+POW_HASHRATE = REGISTRY.gauge('blockchain_pow_hashes_per_second', 'Hash rate of the most recent proof of work')
+ADMISSION_SECONDS = REGISTRY.histogram('blockchain_transaction_admission_seconds',
+                                       'Transaction admission latency by stage', ['stage'])
+TRANSACTIONS = REGISTRY.counter('blockchain_transactions_total', 'Transactions submitted by outcome', ['outcome'])
+RESOLVE_SECONDS = REGISTRY.histogram('blockchain_resolve_conflicts_seconds', 'Duration of resolve_conflicts')
+RESOLVE_BYTES = REGISTRY.counter('blockchain_resolve_conflicts_bytes_total',
+                                 'Bytes of peer chains pulled by resolve_conflicts, as transferred (compressed)')
 
 class Blockchain:
-    def __init__(self):
-        self.db = init_db()
-        self.pending_transactions = []
+    def __init__(self, store=None, archive=None):
+        self.store = store if store is not None else open_store()
+        self.listeners = []
+        self.hash_cache = {}
+        self.hash_cache_epoch = None
+        self.lock = threading.RLock()
+
+        # Ids of transactions this process admitted, so replays and gossip echoes
+        # are rejected in memory even after the transaction has been mined
+        self.recent_txids = SeenCache(int(os.environ.get('BLOCKCHAIN_TXID_CACHE', 100000)))
+
+        # Optional append-only block archive used to serve raw blocks
+        if archive is None and os.environ.get('BLOCKCHAIN_ARCHIVE_DIR'):
+            archive = BlockFile(os.environ['BLOCKCHAIN_ARCHIVE_DIR'])
+        self.archive = archive
         
         # Create genesis block if not exists
-        if not self.db.query(Block).first():
-            self.create_block(proof=100, previous_hash="0")
-
-    def create_block(self, proof, previous_hash):
-        # Create new block in database
-        block = Block(
-            index=len(self.get_chain()) + 1,
-            proof=proof,
-            previous_hash=previous_hash
-        )
-        self.db.add(block)
-        
-        # Add pending transactions to block
-        for tx in self.pending_transactions:
-            transaction = Transaction(
-                sender=tx['sender'],
-                recipient=tx['recipient'],
-                amount=tx['amount'],
-                block=block
-            )
-            self.db.add(transaction)
-        
-        # Reset pending transactions
-        self.pending_transactions = []
-        
-        self.db.commit()
-        print(f"Block {block.index} created with {len(block.transactions)} transactions.")
-        return block
+        if self.store.get_last_block() is None:
+            try:
+                self.create_block(proof=100, previous_hash="0")
+            except StaleBlockError:
+                pass  # Another worker process created it first
+        elif self.archive is not None:
+            self.sync_archive()
 
-    def get_last_block(self):
-        """Get the last block in a serializable format"""
-        block = self.db.query(Block).order_by(Block.index.desc()).first()
-        if block:
-            return {
-                'index': block.index,
-                'timestamp': block.timestamp.timestamp(),
-                'proof': block.proof,
-                'previous_hash': block.previous_hash,
+    @property
+    def pending_transactions(self):
+        """Transactions waiting for the next block, shared through the store"""
+        return self.store.get_pending()
+
+    def create_block(self, proof, previous_hash, reward_address=None, reward=1.0):
+        """Create a new block from the pending transactions and persist it.
+
+        ``reward_address`` adds the mining reward to this block only; it never
+        enters the shared mempool, so a losing miner's reward cannot leak into
+        another worker's block.
+        """
+        with self.lock:
+            last_block = self.get_last_block()
+            if last_block is not None and previous_hash != self.hash(last_block):
+                raise StaleBlockError("Chain tip changed while mining; block is stale")
+
+            pending = self.store.get_pending()
+            mined = self.store.confirmed_txids(tx['txid'] for tx in pending)
+            if mined:
+                # Admitted by another worker before it saw the block that confirmed them
+                self.store.remove_pending(mined)
+                pending = [tx for tx in pending if tx['txid'] not in mined]
+            pending = self._affordable(pending)
+            block = {
+                'index': self.chain_length + 1,
+                'timestamp': time(),
+                'proof': proof,
+                'previous_hash': previous_hash,
                 'transactions': [
                     {
-                        'sender': tx.sender,
-                        'recipient': tx.recipient,
-                        'amount': tx.amount
-                    } for tx in block.transactions
+                        'sender': tx['sender'],
+                        'recipient': tx['recipient'],
+                        'amount': tx['amount']
+                    } for tx in pending
                 ]
             }
-        return None
+            if reward_address is not None:
+                block['transactions'].append({'sender': "0", 'recipient': reward_address, 'amount': float(reward)})
+            # Fails with StaleBlockError if another worker appended at this height first
+            block = self.store.append_block(block, confirmed=pending)
+            if self.archive is not None:
+                self.archive.append(block)
+        
+        logger.info("Block %d created with %d transactions", block['index'], len(block['transactions']))
+        self._notify('block', block)
+        return block
+
+    def add_block(self, block):
+        """Append a block mined by a peer if it extends our tip with a valid proof"""
+        with self.lock:
+            last_block = self.get_last_block()
+            if block['index'] != last_block['index'] + 1:
+                return False
+            if block['previous_hash'] != self.hash(last_block):
+                return False
+            if not self.valid_proof(last_block['proof'], block['proof'], block['previous_hash']):
+                return False
+            if not all(units.representable(tx['amount']) for tx in block['transactions']):
+                return False
+
+            # Drop pending transactions the block already confirms
+            confirmed = self._confirmed_pending([block])
+            try:
+                block = self.store.append_block(block, confirmed=confirmed)
+            except StaleBlockError:
+                return False
+            if self.archive is not None:
+                self.archive.append(block)
+
+        logger.info("Block %d received from peer", block['index'])
+        self._notify('block', block)
+        return True
+
+    def _affordable(self, pending):
+        """Keep the pending transactions each sender's confirmed balance covers, in order.
+
+        Admission already counts pending spends, but concurrent admissions on
+        other workers can still overdraw; those transactions leave the mempool.
+        """
+        available = {}
+        affordable = []
+        overdrawn = []
+        for tx in pending:
+            sender = tx['sender']
+            if sender not in available:
+                available[sender] = units.to_units(self.store.get_balance(sender))
+            amount = units.to_units(tx['amount'])
+            if amount > available[sender]:
+                overdrawn.append(tx['txid'])
+                continue
+            available[sender] -= amount
+            affordable.append(tx)
+        if overdrawn:
+            logger.warning("Dropping %d pending transactions that overdraw their sender", len(overdrawn))
+            self.store.remove_pending(overdrawn)
+        return affordable
+
+    def _spendable(self, sender, budget=None):
+        """Confirmed balance minus pending spends for ``sender``, in base units"""
+        if budget is not None and sender in budget:
+            return budget[sender]
+        spendable = (units.to_units(self.store.get_balance(sender))
+                     - units.to_units(self.store.get_pending_spend(sender)))
+        if budget is not None:
+            budget[sender] = spendable
+        return spendable
+
+    def _confirmed_pending(self, blocks):
+        """Pending transactions that ``blocks`` include, matched by (sender, recipient, amount)"""
+        included = [(tx['sender'], tx['recipient'], tx['amount'])
+                    for block in blocks for tx in block['transactions']]
+        pending = self.store.get_pending()
+        # Entries another worker already saw confirmed are left for create_block to purge
+        mined = self.store.confirmed_txids(tx['txid'] for tx in pending)
+        confirmed = []
+        for tx in pending:
+            if tx['txid'] in mined:
+                continue
+            key = (tx['sender'], tx['recipient'], tx['amount'])
+            if key in included:
+                included.remove(key)
+                confirmed.append(tx)
+        return confirmed
+
+    def add_listener(self, listener):
+        """Register ``listener(kind, item)`` to run after a block or transaction is accepted"""
+        self.listeners.append(listener)
+
+    def _notify(self, kind, item):
+        for listener in self.listeners:
+            try:
+                listener(kind, item)
+            except Exception:
+                logger.exception("Listener error on %s", kind)
+
+    def get_last_block(self):
+        """Get the last block in a serializable format"""
+        return self.store.get_last_block()
 
     def get_chain(self):
         """Get the full chain"""
-        chain = []
-        blocks = self.db.query(Block).order_by(Block.index).all()
-        return chain
+        return self.store.get_chain()
+
+    def get_block_bytes(self, index):
+        """Get a single block as canonical JSON bytes, served from the archive when enabled"""
+        if self.archive is not None:
+            return self.archive.read(index)
+        block = self.store.get_block(index)
+        return BlockFile.serialize(block) if block else None
+
+    def iter_chain_bytes(self, start=1):
+        """Yield canonical JSON bytes for every block from ``start`` to the tip"""
+        if self.archive is not None:
+            yield from self.archive.iter_range(start)
+            return
+        for block in self.store.get_chain()[max(start, 1) - 1:]:
+            yield BlockFile.serialize(block)
+
+    def _current_hash_cache(self):
+        """The block hash cache, emptied if any worker has replaced the chain since it was filled"""
+        epoch = self.store.chain_epoch()
+        if epoch != self.hash_cache_epoch:
+            self.hash_cache = {}
+            self.hash_cache_epoch = epoch
+        return self.hash_cache
+
+    def _block_hash(self, cache, index):
+        block_hash = cache.get(index)
+        if block_hash is None:
+            data = self.get_block_bytes(index)
+            if data is None:
+                return None
+            block_hash = hashlib.sha256(data).hexdigest()
+            cache[index] = block_hash
+        return block_hash
+
+    def block_hash(self, index):
+        """Hash of the block at ``index``; it commits to every block before it"""
+        return self._block_hash(self._current_hash_cache(), index)
+
+    def block_hashes(self, heights):
+        """Map of height to block hash for the heights that exist"""
+        cache = self._current_hash_cache()
+        hashes = {}
+        for height in heights:
+            block_hash = self._block_hash(cache, height)
+            if block_hash is not None:
+                hashes[height] = block_hash
+        return hashes
+
+    def checkpoints(self, interval):
+        """Block hashes at every multiple of ``interval`` up to the tip"""
+        cache = self._current_hash_cache()
+        return [self._block_hash(cache, height) for height in range(interval, self.chain_length + 1, interval)]
+
+    def sync_archive(self):
+        """Bring the block archive in line with the store after a restart or chain replacement"""
+        length = self.chain_length
+        archived = len(self.archive)
+        if archived > length:
+            self.archive.truncate(length)
+            archived = length
+        if archived and self.archive.read(archived) != BlockFile.serialize(self.store.get_block(archived)):
+            self.archive.truncate(0)
+            archived = 0
+        for block in self.store.get_chain()[archived:]:
+            self.archive.append(block)
 
     @property
     def chain_length(self):
         """Get the length of the chain"""
-        return self.db.query(Block).count()
+        return self.store.chain_length()
+
+    @staticmethod
+    def transaction_id(transaction):
+        """Identify a transaction by the hash of its canonical binary form (see wire.transaction_bytes)"""
+        return wire.transaction_id(transaction)
+
+    def known_transaction(self, txid):
+        """True if ``txid`` was admitted recently, is in the mempool or is already in a block"""
+        return (txid in self.recent_txids
+                or self.get_pending_transaction(txid) is not None
+                or bool(self.store.confirmed_txids([txid])))
+
+    def get_pending_transaction(self, txid):
+        """Find a pending transaction by id"""
+        return self.store.get_pending_transaction(txid)
+
+    def new_transaction(self, sender, recipient, amount, signature=None, public_key=None, timestamp=None,
+                        scheme=None, version=None, budget=None):
+        """Creates a new transaction to go into the next mined block.
 
-    def new_transaction(self, sender, recipient, amount, signature=None, public_key=None):
-        """Creates a new transaction to go into the next mined block"""
+        ``budget`` is a dict shared across a batch: it caches each sender's
+        spendable base units so their balance and pending spends are summed once.
+        """
+        started = time()
         try:
-            # Create transaction object
+            # Amounts are stored as integer base units, so finer fractions can't be kept exactly
+            if not units.representable(amount) or units.to_units(amount) <= 0:
+                raise ValueError(f"Amount must be a positive multiple of {1 / units.COIN:.8f}")
+
+            # Create transaction object (relayed transactions keep their original timestamp)
             transaction = {
                 'sender': sender,
                 'recipient': recipient,
                 'amount': float(amount),
-                'timestamp': datetime.utcnow().timestamp(),
-                'public_key': public_key
+                'timestamp': float(timestamp) if timestamp is not None else datetime.utcnow().timestamp(),
+                'public_key': public_key,
+                'signature': signature,
+                'version': int(version or 1)
             }
+            # The id covers only signed content, so a replay under a new timestamp
+            # (which version 1 doesn't sign) keeps its id and is caught here
+            transaction['txid'] = self.transaction_id(transaction)
+            if self.known_transaction(transaction['txid']):
+                raise ValueError("Duplicate transaction")
             
             # Mining rewards don't need verification
             if sender != "0":  # "0" is our mining reward sender
                 if not signature or not public_key:
                     raise ValueError("Transaction must be signed and include public key")
                     
-                # Verify sender has sufficient balance
-                balance = self.get_balance(sender)
-                if balance < float(amount):
-                    raise ValueError(f"Insufficient balance: {balance} < {amount}")
+                # Verify sender can cover this on top of what is already pending
+                with ADMISSION_SECONDS.time(stage='balance_check'):
+                    spendable = self._spendable(sender, budget)
+                if spendable < units.to_units(amount):
+                    raise ValueError(f"Insufficient balance: {units.from_units(spendable)} < {amount}")
                     
                 # Verify signature
-                if not self.verify_transaction(transaction, signature, public_key):
+                with ADMISSION_SECONDS.time(stage='signature_verify'):
+                    valid = self.verify_transaction(dict(transaction, scheme=scheme), signature, public_key)
+                if not valid:
                     raise ValueError("Invalid transaction signature")
             
-            # Add to pending transactions
-            self.pending_transactions.append(transaction)
-            
-            # Save to database
+            # Add to the shared mempool (raises on a duplicate admitted concurrently)
             try:
-                tx = Transaction(
-                    sender=sender,
-                    recipient=recipient,
-                    amount=float(amount)
-                )
-                self.db.add(tx)
-                self.db.commit()
-                print(f"Transaction from {sender} to {recipient} for {amount} added to blockchain.")
-            except Exception as e:
-                self.db.rollback()
-                print(f"Database error: {str(e)}")
+                with ADMISSION_SECONDS.time(stage='db_commit'):
+                    self.store.add_transaction(transaction)
+            except ValueError:
+                raise
+            except Exception:
+                logger.exception("Database error storing transaction")
                 raise
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Transaction admitted", extra={
+                    'sample_every': 100,
+                    'fields': {'txid': transaction['txid'], 'sender': sender,
+                               'recipient': recipient, 'amount': transaction['amount']}
+                })
+
+            if budget is not None and sender != "0":
+                budget[sender] -= units.to_units(amount)
+            self.recent_txids.add(transaction['txid'])
+            self._notify('transaction', transaction)
+            ADMISSION_SECONDS.observe(time() - started, stage='total')
+            TRANSACTIONS.inc(outcome='accepted')
                 
             return self.get_last_block()['index'] + 1
             
         except Exception as e:
-            print(f"Transaction error: {str(e)}")
+            TRANSACTIONS.inc(outcome='rejected')
+            logger.warning("Transaction rejected: %s", e, extra={'sample_every': 10})
             raise
 
     def get_balance(self, address):
         """Calculate balance for an address"""
-        balance = 0
-        chain = self.get_chain()
-        
-        for block in chain:
-            for tx in block['transactions']:
-                if tx['recipient'] == address:
-                    balance += float(tx['amount'])
-                if tx['sender'] == address:
-                    balance -= float(tx['amount'])
-                    
-        print(f"Balance for {address}: {balance} coins")
+        balance = self.store.get_balance(address)
+        logger.debug("Balance for %s: %s coins", address, balance)
         return balance
 
     @staticmethod
@@ -155,11 +382,18 @@ class Blockchain:
         last_proof = last_block['proof']
         last_hash = self.hash(last_block)
 
+        started = time()
         proof = 0
-        while self.valid_proof(last_proof, proof, last_hash) is False:
-            proof += 1
+        with profiling.span('pow'):
+            while self.valid_proof(last_proof, proof, last_hash) is False:
+                proof += 1
 
-        print(f"Proof of work found: {proof}")
+        elapsed = time() - started
+        POW_HASHES.inc(proof + 1)
+        POW_SECONDS.observe(elapsed)
+        if elapsed > 0:
+            POW_HASHRATE.set((proof + 1) / elapsed)
+        logger.debug("Proof of work found: %d after %.3fs", proof, elapsed)
         return proof
 
     @staticmethod
@@ -183,12 +417,17 @@ class Blockchain:
             
             # Check that the hash of the block is correct
             if block['previous_hash'] != self.hash(previous_block):
-                print(f"Invalid previous hash at block {block['index']}")
+                logger.warning("Invalid previous hash at block %d", block['index'])
                 return False
 
             # Check that the Proof of Work is correct
             if not self.valid_proof(previous_block['proof'], block['proof'], block['previous_hash']):
-                print(f"Invalid proof of work at block {block['index']}")
+                logger.warning("Invalid proof of work at block %d", block['index'])
+                return False
+
+            # The store keeps amounts in base units; finer amounts would change the block hash
+            if not all(units.representable(tx['amount']) for tx in block['transactions']):
+                logger.warning("Amount with more than 8 decimal places at block %d", block['index'])
                 return False
 
             previous_block = block
@@ -199,117 +438,77 @@ class Blockchain:
     def register_node(self, address):
         """Add a new node to the list of nodes"""
         try:
-            existing_node = self.db.query(Node).filter_by(address=address).first()
-            if not existing_node:
-                node = Node(address=address)
-                self.db.add(node)
-                self.db.commit()
-        except Exception as e:
-            self.db.rollback()
-            print(f"Error registering node {address}: {str(e)}")
+            self.store.register_node(address)
+        except Exception:
+            logger.exception("Error registering node %s", address)
             raise
 
     def resolve_conflicts(self):
         """Consensus algorithm: replaces chain with longest valid chain"""
-        nodes = self.db.query(Node).all()
+        with RESOLVE_SECONDS.time():
+            return self._resolve_conflicts()
+
+    def _resolve_conflicts(self):
+        nodes = self.store.get_nodes()
         new_chain = None
         max_length = self.chain_length
         
         for node in nodes:
-            response = requests.get(f'{node.address}/chain')
+            try:
+                response = peer_client.get(f'{node}/chain', headers=wire.ACCEPT_BINARY, timeout=30)
+            except Exception as e:
+                logger.warning("Could not fetch chain from %s: %s", node, e)
+                continue
+            RESOLVE_BYTES.inc(peer_client.transferred_bytes(response))
             if response.status_code == 200:
-                length = response.json()['length']
-                chain = response.json()['chain']
+                data = wire.decode_response(response)
+                length = data['length']
+                chain = data['chain']
                 
                 if length > max_length and self.is_chain_valid(chain):
                     max_length = length
                     new_chain = chain
 
         if new_chain:
-            # Clear existing chain
-            self.db.query(Block).delete()
-            self.db.query(Transaction).delete()
-            
-            # Add new chain
-            for block_data in new_chain:
-                block = Block(
-                    index=block_data['index'],
-                    timestamp=datetime.fromtimestamp(block_data['timestamp']),
-                    proof=block_data['proof'],
-                    previous_hash=block_data['previous_hash']
-                )
-                self.db.add(block)
-                
-                # Add transactions
-                for tx_data in block_data['transactions']:
-                    tx = Transaction(
-                        sender=tx_data['sender'],
-                        recipient=tx_data['recipient'],
-                        amount=tx_data['amount'],
-                        block=block
-                    )
-                    self.db.add(tx)
-            
-            self.db.commit()
-            print("Blockchain was replaced with the new longer valid chain.")
+            with self.lock:
+                # Blocks past the fork point are new to us; their transactions leave the mempool
+                fork = 0
+                for ours, theirs in zip(self.store.get_chain(), new_chain):
+                    if self.hash(ours) != self.hash(theirs):
+                        break
+                    fork += 1
+                confirmed = self._confirmed_pending(new_chain[fork:])
+                self.store.replace_chain(new_chain, confirmed=confirmed, fork=fork)
+                if self.archive is not None:
+                    self.archive.truncate(0)
+                    self.sync_archive()
+            self._notify('block', self.get_last_block())
+            logger.info("Chain replaced with a longer valid chain of %d blocks", max_length)
             return True
         
-        print("No conflicts detected. Our chain is authoritative.")
+        logger.info("No conflicts detected; our chain is authoritative")
         return False
 
     @staticmethod
     def verify_transaction(transaction, signature, public_key_pem):
-        """Verify the signature of a transaction"""
+        """Verify the signature of a transaction under its signature scheme"""
         try:
-            print("\nVerifying transaction signature...")
-            
-            # Create the same message format used for signing
-            message_dict = {
-                'sender': transaction['sender'],
-                'recipient': transaction['recipient'],
-                'amount': float(transaction['amount'])
-            }
-
-            # Create message string in exactly the same way
-            message = json.dumps(message_dict, sort_keys=True)
-            print(f"Message to verify: {message}")
-            message_bytes = message.encode('utf-8')
-            
             # Convert hex signature back to bytes
             try:
                 signature_bytes = bytes.fromhex(signature)
-                print(f"Signature length: {len(signature_bytes)} bytes")
             except ValueError as e:
-                print(f"Invalid signature format: {str(e)}")
-                return False
-
-            # Load public key
-            try:
-                public_key = serialization.load_pem_public_key(public_key_pem.encode())
-            except Exception as e:
-                print(f"Error loading public key: {str(e)}")
+                logger.debug("Invalid signature format: %s", e)
                 return False
 
-            # Verify signature
-            try:
-                public_key.verify(
-                    signature_bytes,
-                    message_bytes,
-                    padding.PSS(
-                        mgf=padding.MGF1(hashes.SHA256()),
-                        salt_length=padding.PSS.MAX_LENGTH
-                    ),
-                    hashes.SHA256()
-                )
-                print("✓ Signature verified successfully")
-                return True
-            except InvalidSignature:
-                print("✗ Invalid signature")
-                return False
-            except Exception as e:
-                print(f"Verification error: {str(e)}")
-                return False
+            with profiling.span('crypto'):
+                valid = signatures.verify_transaction(transaction, signature_bytes, public_key_pem)
+            if not valid:
+                logger.debug("Invalid signature from %s", transaction['sender'])
+            return valid
 
-        except Exception as e:
-            print(f"Error in verify_transaction: {str(e)}")
-            return False
\ No newline at end of file
+        except ValueError as e:
+            logger.debug("Verification error: %s", e)
+            return False
+        except Exception:
+            logger.exception("Error in verify_transaction")
+            return False
@@ -1,17 +1,22 @@
 import click
 import requests
 from wallet import Wallet
+from hdwallet import HDWallet
+import os
 import json
+import peer_client
+from peer_client import ChainCache
 from datetime import datetime
 
 class BlockchainCLI:
     def __init__(self, node_url="http://localhost:5000"):
         self.node_url = node_url
         self.wallet = None
+        self.chain_cache = ChainCache()
 
-    def create_wallet(self):
+    def create_wallet(self, scheme=None):
         """Create a new wallet"""
-        self.wallet = Wallet()
+        self.wallet = Wallet(scheme=scheme)
         print(f"✅ New wallet created!")
         print(f"Address: {self.wallet.address}")
         return self.wallet
@@ -22,12 +27,11 @@ class BlockchainCLI:
             print("❌ No wallet loaded. Create or load a wallet first.")
             return
         
-        response = requests.get(f"{self.node_url}/chain")
-        if response.status_code != 200:
+        try:
+            chain = self.chain_cache.get_chain(self.node_url)['chain']
+        except requests.exceptions.HTTPError:
             print("❌ Failed to get blockchain data")
             return
-
-        chain = response.json()['chain']
         balance = 0
 
         # Calculate balance from blockchain
@@ -54,7 +58,7 @@ class BlockchainCLI:
             print(f"Transaction created: {transaction}")
 
             # Send to node
-            response = requests.post(
+            response = peer_client.post(
                 f"{self.node_url}/transactions/new",
                 json=transaction  # Send the complete transaction
             )
@@ -81,7 +85,7 @@ class BlockchainCLI:
             return
 
         print("⛏️ Mining new block...")
-        response = requests.get(f"{self.node_url}/mine")
+        response = peer_client.get(f"{self.node_url}/mine", timeout=60)
         
         if response.status_code == 200:
             result = response.json()
@@ -95,12 +99,11 @@ class BlockchainCLI:
 
     def show_chain(self):
         """Show the current blockchain"""
-        response = requests.get(f"{self.node_url}/chain")
-        if response.status_code != 200:
+        try:
+            chain = self.chain_cache.get_chain(self.node_url)
+        except requests.exceptions.HTTPError:
             print("❌ Failed to get blockchain")
             return
-
-        chain = response.json()
         print("\n📦 Blockchain:")
         print(f"Length: {chain['length']} blocks")
         
@@ -116,10 +119,39 @@ def cli():
     pass
 
 @cli.command()
-def create():
+@click.option('--scheme', type=click.Choice(['rsa-pss', 'ed25519']), default='rsa-pss',
+              help='Signature scheme for the new wallet')
+def create(scheme):
     """Create a new wallet"""
     blockchain = BlockchainCLI()
-    blockchain.create_wallet()
+    blockchain.create_wallet(scheme)
+
+@cli.command()
+@click.argument('filename', default='hd_wallet.seed')
+@click.option('--account', type=int, default=0, help='Account number in the derivation path')
+def hd_new(filename, account):
+    """Create a deterministic (HD) wallet seed file"""
+    if os.path.exists(filename):
+        print(f"❌ {filename} already exists")
+        return
+    hd = HDWallet(account=account)
+    hd.save_to_file(filename)
+    print(f"✅ HD wallet seed saved to {filename} (back this file up)")
+    print(f"First address ({hd.path(0)}): {hd.address(0)}")
+
+@cli.command()
+@click.argument('filename', default='hd_wallet.seed')
+@click.option('--start', type=int, default=0, help='First derivation index')
+@click.option('--count', type=int, default=10, help='Number of addresses')
+def hd_addresses(filename, start, count):
+    """List addresses derived from an HD wallet seed file"""
+    try:
+        hd = HDWallet.load_from_file(filename)
+    except Exception as e:
+        print(f"❌ Error loading {filename}: {str(e)}")
+        return
+    for index, address in hd.addresses(start, count):
+        print(f"{hd.path(index)}  {address}")
 
 @cli.command()
 def balance():
@@ -0,0 +1,156 @@
+import json
+import mmap
+import os
+import struct
+import threading
+
+
+class BlockFile:
+    """Append-only archive of serialized blocks.
+
+    Blocks are written as canonical JSON (the same bytes ``Blockchain.hash``
+    digests) to numbered segment files, with a fixed-width offset index so a
+    block can be located without scanning. Reads go through ``mmap`` and
+    return the stored bytes directly, so serving a block never re-serializes it.
+    """
+
+    INDEX_RECORD = struct.Struct('<IQI')  # segment, offset, length
+
+    def __init__(self, directory, segment_size=128 * 1024 * 1024):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.lock = threading.RLock()
+        self._maps = {}
+        os.makedirs(directory, exist_ok=True)
+
+        self.index_path = os.path.join(directory, 'index.dat')
+        self._entries = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            usable = len(data) - len(data) % self.INDEX_RECORD.size
+            self._entries = [
+                self.INDEX_RECORD.unpack_from(data, offset)
+                for offset in range(0, usable, self.INDEX_RECORD.size)
+            ]
+        self._drop_torn_entries()
+        self._index = open(self.index_path, 'ab')
+
+        self._segment = self._entries[-1][0] if self._entries else 0
+        self._writer = open(self._segment_path(self._segment), 'ab')
+
+    @staticmethod
+    def serialize(block):
+        """Canonical block encoding shared with Blockchain.hash"""
+        return json.dumps(block, sort_keys=True).encode()
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f'blk{segment:05d}.dat')
+
+    def _drop_torn_entries(self):
+        """Discard index records that point past the end of their segment (e.g. after a crash)"""
+        sizes = {}
+        valid = len(self._entries)
+        for i, (segment, offset, length) in enumerate(self._entries):
+            if segment not in sizes:
+                path = self._segment_path(segment)
+                sizes[segment] = os.path.getsize(path) if os.path.exists(path) else 0
+            if offset + length > sizes[segment]:
+                valid = i
+                break
+        if valid != len(self._entries):
+            self._entries = self._entries[:valid]
+            self._rewrite_index()
+
+    def _rewrite_index(self):
+        with open(self.index_path, 'wb') as f:
+            for entry in self._entries:
+                f.write(self.INDEX_RECORD.pack(*entry))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, block):
+        """Append a block dict; its index must be the next height"""
+        if block['index'] != len(self._entries) + 1:
+            raise ValueError(f"Expected block {len(self._entries) + 1}, got {block['index']}")
+        return self.append_raw(self.serialize(block))
+
+    def append_raw(self, data):
+        """Append already-serialized block bytes and return the new height"""
+        with self.lock:
+            offset = self._writer.tell()
+            if offset and offset + len(data) > self.segment_size:
+                self._writer.close()
+                self._segment += 1
+                self._writer = open(self._segment_path(self._segment), 'ab')
+                offset = 0
+            self._writer.write(data)
+            self._writer.flush()
+
+            entry = (self._segment, offset, len(data))
+            self._index.write(self.INDEX_RECORD.pack(*entry))
+            self._index.flush()
+            self._entries.append(entry)
+            return len(self._entries)
+
+    def _map(self, segment, end):
+        """Return an mmap of ``segment`` that covers at least ``end`` bytes"""
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            with open(self._segment_path(segment), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def read(self, index):
+        """Return the stored bytes for block ``index`` (1-based), or None"""
+        with self.lock:
+            if index < 1 or index > len(self._entries):
+                return None
+            segment, offset, length = self._entries[index - 1]
+            return self._map(segment, offset + length)[offset:offset + length]
+
+    def iter_range(self, start=1, stop=None):
+        """Yield stored block bytes for heights ``start`` through ``stop`` inclusive"""
+        stop = len(self._entries) if stop is None else min(stop, len(self._entries))
+        for index in range(max(start, 1), stop + 1):
+            yield self.read(index)
+
+    def truncate(self, length):
+        """Drop every block above height ``length``"""
+        with self.lock:
+            if length >= len(self._entries):
+                return
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps = {}
+            self._writer.close()
+            self._index.close()
+
+            if length:
+                segment, offset, size = self._entries[length - 1]
+                keep_end = offset + size
+            else:
+                segment, keep_end = 0, 0
+            for stale in {entry[0] for entry in self._entries[length:]}:
+                if stale > segment:
+                    os.remove(self._segment_path(stale))
+            with open(self._segment_path(segment), 'ab') as f:
+                f.truncate(keep_end)
+
+            self._entries = self._entries[:length]
+            self._rewrite_index()
+            self._index = open(self.index_path, 'ab')
+            self._segment = segment
+            self._writer = open(self._segment_path(segment), 'ab')
+
+    def close(self):
+        with self.lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps = {}
+            self._writer.close()
+            self._index.close()
@@ -0,0 +1,119 @@
+"""Structured, level-gated logging for the node and its hot paths.
+
+Modules log through ``get_logger(__name__)`` with lazy ``%s`` arguments and
+an optional ``extra={'fields': {...}}`` dict. ``configure()`` routes every
+record through a queue to a background listener thread, so formatting and
+stdout I/O never run on the request thread. Records carrying
+``extra={'sample_every': N}`` are thinned to one in N per message.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+ROOT = 'blockchain'
+
+_listener = None
+_lock = threading.Lock()
+
+
+def get_logger(name):
+    """Return a logger under the ``blockchain`` hierarchy"""
+    return logging.getLogger(f'{ROOT}.{name}')
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's structured fields merged in"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with structured fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in ``sample_every`` records per (logger, message) for tagged hot-path events"""
+
+    def __init__(self):
+        super().__init__()
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        every = getattr(record, 'sample_every', None)
+        if not every or every <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % every == 0
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock ``prepare`` formats the record in the caller; callers here pass
+    only immutable arguments, so the record can be queued untouched.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure(level=None, fmt=None, stream=None):
+    """Install the queued handler on the ``blockchain`` logger (idempotent).
+
+    ``level`` defaults to $LOG_LEVEL (INFO) and ``fmt`` to $LOG_FORMAT
+    ('text' or 'json').
+    """
+    global _listener
+    with _lock:
+        level = level or os.environ.get('LOG_LEVEL', 'INFO')
+        fmt = fmt or os.environ.get('LOG_FORMAT', 'text')
+        root = logging.getLogger(ROOT)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        if _listener is not None:
+            return root
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+        records = queue.SimpleQueue()
+        handler = DeferredQueueHandler(records)
+        handler.addFilter(SamplingFilter())
+        root.addHandler(handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return root
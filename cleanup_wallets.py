@@ -1,72 +1,181 @@
+import argparse
 import os
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from wallet_index import WalletIndex, read_entry
 from wallet import Wallet
 
-def cleanup_wallets():
-    """Clean up wallet files and organize them"""
-    print("Starting wallet cleanup...")
-    
+WALLET_SUFFIXES = ('.pem', '.pen')
+
+
+def find_wallet_files(src, recursive=False, exclude=()):
+    """Paths of potential wallet files under ``src``, skipping the ``exclude`` directories"""
+    exclude = {os.path.abspath(path) for path in exclude}
+    pending = [src]
+    while pending:
+        directory = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and os.path.abspath(entry.path) not in exclude:
+                        pending.append(entry.path)
+                elif entry.name.endswith(WALLET_SUFFIXES) and entry.is_file():
+                    yield entry.path
+
+
+def check_wallet(path, full=False):
+    """Validate one file; returns (path, index entry, error)"""
+    try:
+        entry = read_entry(path)
+        if full:
+            # Also parse the private key and check it matches the stored address
+            Wallet.load_from_file(path)
+        return path, entry, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def _check_full(path):
+    return check_wallet(path, full=True)
+
+
+def validate(paths, workers=1, full=True):
+    """Yield check_wallet results, in a process pool when ``workers`` > 1"""
+    check = _check_full if full else check_wallet
+    if workers <= 1:
+        for path in paths:
+            yield check(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Large chunks keep the per-file IPC overhead small
+        chunksize = max(1, min(256, len(paths) // (workers * 4)))
+        yield from executor.map(check, paths, chunksize=chunksize)
+
+
+def destination_name(address, dst):
+    """wallet_<first 8 chars>.pem, or the full address when that name is taken by another wallet"""
+    filename = f"wallet_{address[:8]}.pem"
+    path = os.path.join(dst, filename)
+    if os.path.exists(path):
+        try:
+            if read_entry(path)['address'] == address:
+                return filename
+        except ValueError:
+            pass
+        filename = f"wallet_{address}.pem"
+    return filename
+
+
+def cleanup_wallets(src='.', dst='wallets', invalid_dir='invalid_wallets', recursive=False,
+                    workers=1, dry_run=False, full=True, quiet=False):
+    """Clean up wallet files and organize them.
+
+    ``full`` loads every private key; without it only the public key and
+    address are checked, so a corrupt private key passes as valid.
+    """
+    mode = "private key and address" if full else "public key and address only; private keys NOT checked"
+    print("Starting wallet cleanup..." + (" (dry run)" if dry_run else ""))
+    print(f"Validation: {mode}")
+
     # Create wallets directory if it doesn't exist
-    if not os.path.exists('wallets'):
-        os.makedirs('wallets')
-        
+    if not dry_run and not os.path.exists(dst):
+        os.makedirs(dst)
+    index = WalletIndex(dst)
+
     # Get all potential wallet files
-    wallet_files = []
-    for file in os.listdir('.'):
-        if file.endswith(('.pem', '.pen')) and os.path.isfile(file):
-            wallet_files.append(file)
-            
-    print(f"Found {len(wallet_files)} potential wallet files")
-    
+    started = time.perf_counter()
+    wallet_files = list(find_wallet_files(src, recursive, exclude=(dst, invalid_dir)))
+    scanned = time.perf_counter()
+    print(f"Found {len(wallet_files)} potential wallet files in {scanned - started:.2f}s")
+
     # Process each file
     valid_wallets = []
     invalid_files = []
-    
-    for file in wallet_files:
-        try:
-            # Try to load the wallet to verify it's valid
-            wallet = Wallet.load_from_file(file)
-            
-            # Create new filename based on address
-            new_filename = f"wallet_{wallet.address[:8]}.pem"
-            new_path = os.path.join('wallets', new_filename)
-            
-            # Move to wallets directory
-            shutil.move(file, new_path)
-            valid_wallets.append({
-                'original_file': file,
-                'new_file': new_filename,
-                'address': wallet.address
-            })
-            print(f"✓ Valid wallet moved: {file} -> {new_filename}")
-            
-        except Exception as e:
-            print(f"✗ Invalid wallet file {file}: {str(e)}")
-            invalid_files.append(file)
-            
-            # Move invalid files to 'invalid' directory
-            if not os.path.exists('invalid_wallets'):
-                os.makedirs('invalid_wallets')
+
+    for file, entry, error in validate(wallet_files, workers, full):
+        relpath = os.path.relpath(file, src)
+        if error is None:
+            if dry_run:
+                valid_wallets.append({'original_file': relpath, 'new_file': None, 'address': entry['address']})
+                continue
+            try:
+                # Create new filename based on address
+                new_filename = destination_name(entry['address'], dst)
+
+                # Move to wallets directory and record it in the wallet index
+                shutil.move(file, os.path.join(dst, new_filename))
+                index.add(new_filename, entry, save=False)
+                valid_wallets.append({
+                    'original_file': relpath,
+                    'new_file': new_filename,
+                    'address': entry['address']
+                })
+                if not quiet:
+                    print(f"✓ Valid wallet moved: {relpath} -> {new_filename}")
+            except Exception as e:
+                print(f"✗ Error moving wallet {relpath}: {str(e)}")
+        else:
+            invalid_files.append(relpath)
+            if not quiet:
+                print(f"✗ Invalid wallet file {relpath}: {error}")
+            if dry_run:
+                continue
+
+            # Move invalid files to 'invalid' directory, keeping their relative path
             try:
-                shutil.move(file, os.path.join('invalid_wallets', file))
-                print(f"  Moved to invalid_wallets directory")
+                target = os.path.join(invalid_dir, relpath)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(file, target)
+                if not quiet:
+                    print(f"  Moved to {invalid_dir} directory")
             except Exception as move_error:
                 print(f"  Error moving file: {str(move_error)}")
-    
+
+    finished = time.perf_counter()
+    if not dry_run:
+        index.save()
+
     # Print summary
     print("\nCleanup Summary:")
-    print(f"Valid wallets: {len(valid_wallets)}")
+    print(f"Valid wallets: {len(valid_wallets)}" + ("" if full else " (public key only, private keys not checked)"))
     print(f"Invalid files: {len(invalid_files)}")
-    
+    elapsed = finished - scanned
+    rate = len(wallet_files) / elapsed if elapsed > 0 else 0
+    print(f"Processed {len(wallet_files)} files in {elapsed:.2f}s "
+          f"({rate:.0f} files/s, {workers} worker{'s' if workers != 1 else ''})")
+
+    if quiet:
+        return valid_wallets, invalid_files
+
     if valid_wallets:
         print("\nValid Wallets:")
         for wallet in valid_wallets:
-            print(f"- {wallet['new_file']} (Address: {wallet['address']})")
-    
+            print(f"- {wallet['new_file'] or wallet['original_file']} (Address: {wallet['address']})")
+
     if invalid_files:
-        print("\nInvalid Files (moved to invalid_wallets/):")
+        print(f"\nInvalid Files{'' if dry_run else f' (moved to {invalid_dir}/)'}:")
         for file in invalid_files:
             print(f"- {file}")
+    return valid_wallets, invalid_files
+
 
 if __name__ == "__main__":
-    cleanup_wallets() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Validate wallet files and move them into a wallet directory')
+    parser.add_argument('--src', default='.', help='Directory to scan for .pem/.pen files')
+    parser.add_argument('--dst', default='wallets', help='Directory that receives valid wallets')
+    parser.add_argument('--invalid-dir', default='invalid_wallets', help='Directory that receives invalid files')
+    parser.add_argument('-r', '--recursive', action='store_true', help='Scan subdirectories of --src')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help=f'Validation processes (this machine has {os.cpu_count()} CPUs)')
+    parser.add_argument('--public-key-only', dest='full', action='store_false',
+                        help='Fast mode: check only the public key and address, NOT the private key '
+                             '(a wallet with a corrupt private key is reported valid)')
+    # Private-key validation is the default; --full is kept for older scripts
+    parser.add_argument('--full', action='store_true', help=argparse.SUPPRESS)
+    parser.set_defaults(full=True)
+    parser.add_argument('--dry-run', action='store_true', help='Report what would happen without moving files')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Only print the summary')
+    args = parser.parse_args()
+    cleanup_wallets(args.src, args.dst, args.invalid_dir, args.recursive,
+                    args.workers, args.dry_run, args.full, args.quiet)
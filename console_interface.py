@@ -1,8 +1,12 @@
 import cmd
 import json
 import requests
+import wire
+import peer_client
+from peer_client import ChainCache
 from blockchain import Blockchain
 from wallet import Wallet
+from hdwallet import HDWallet
 from datetime import datetime
 
 class BlockchainCLI(cmd.Cmd):
@@ -15,11 +19,16 @@ class BlockchainCLI(cmd.Cmd):
         self.wallet = None
         self.mining_reward = 1
         self.difficulty = 4
+        self.chain_cache = ChainCache()
 
     def do_create_wallet(self, arg):
-        'Create a new wallet'
-        self.wallet = Wallet()
-        print(f"New wallet created with address: {self.wallet.address}")
+        'Create a new wallet: create_wallet [rsa-pss|ed25519]'
+        try:
+            self.wallet = Wallet(scheme=arg.strip() or None)
+        except ValueError as e:
+            print(f"❌ {str(e)}")
+            return
+        print(f"New {self.wallet.scheme.name} wallet created with address: {self.wallet.address}")
 
     def do_get_balance(self, arg):
         'Get wallet balance'
@@ -28,12 +37,7 @@ class BlockchainCLI(cmd.Cmd):
                 print("❌ No wallet loaded. Create or load a wallet first.")
                 return
 
-            response = requests.get(f"{self.node_url}/chain")
-            if response.status_code != 200:
-                print(f"❌ Failed to get chain. Status code: {response.status_code}")
-                return
-
-            chain_data = response.json()
+            chain_data = self.chain_cache.get_chain(self.node_url)
             balance = 0
             
             for block in chain_data['chain']:
@@ -48,6 +52,8 @@ class BlockchainCLI(cmd.Cmd):
         except requests.exceptions.ConnectionError:
             print("❌ Could not connect to node. Is the blockchain node running?")
             print("   Start the node with: python node.py")
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Failed to get chain. Status code: {e.response.status_code}")
         except Exception as e:
             print(f"❌ Error: {str(e)}")
 
@@ -74,9 +80,10 @@ class BlockchainCLI(cmd.Cmd):
             }
             
             # Send transaction
-            response = requests.post(
+            response = peer_client.post(
                 f"{self.node_url}/transactions/new", 
-                json=payload
+                data=wire.encode_transaction(payload),
+                headers={'Content-Type': wire.MIMETYPE}
             )
             
             if response.status_code == 201:
@@ -97,6 +104,31 @@ class BlockchainCLI(cmd.Cmd):
         except Exception as e:
             print(f"❌ Error: {str(e)}")
 
+    def do_send_many(self, arg):
+        'Send a batch of payouts: send_many <file> (one "<recipient> <amount>" per line)'
+        if not self.wallet:
+            print("❌ No wallet loaded. Create or load a wallet first.")
+            return
+        try:
+            with open(arg or 'payouts.txt') as f:
+                payouts = [line.split() for line in f if line.strip()]
+            started = datetime.now()
+            transactions = self.wallet.sign_many(payouts)
+            results = peer_client.post_transactions(self.node_url, transactions)
+            elapsed = (datetime.now() - started).total_seconds()
+
+            accepted = sum(1 for result in results if result['status'] == 201)
+            print(f"✅ {accepted}/{len(results)} transactions accepted in {elapsed:.2f}s")
+            for payout, result in zip(payouts, results):
+                if result['status'] != 201:
+                    print(f"   ❌ {payout[0]} {payout[1]}: {result.get('error')}")
+        except requests.exceptions.ConnectionError:
+            print("❌ Could not connect to node. Is the blockchain node running?")
+        except ValueError:
+            print("❌ Each line must be: <recipient> <amount>")
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+
     def do_mine(self, arg):
         'Mine a new block'
         try:
@@ -108,7 +140,7 @@ class BlockchainCLI(cmd.Cmd):
             
             # Set the node identifier to our wallet address
             headers = {'X-Node-Identifier': self.wallet.address}
-            response = requests.get(f"{self.node_url}/mine", headers=headers)
+            response = peer_client.get(f"{self.node_url}/mine", headers=headers, timeout=60)
             
             if response.status_code == 200:
                 result = response.json()
@@ -136,24 +168,22 @@ class BlockchainCLI(cmd.Cmd):
     def do_chain(self, arg):
         'Print the current blockchain'
         try:
-            response = requests.get(f"{self.node_url}/chain")
-            if response.status_code == 200:
-                chain_data = response.json()
-                print("\n📦 Blockchain:")
-                print(f"Length: {chain_data['length']} blocks")
-                
-                for block in chain_data['chain']:
-                    print(f"\nBlock #{block['index']}")
-                    print(f"Previous Hash: {block['previous_hash']}")
-                    print(f"Proof: {block['proof']}")
-                    print("Transactions:")
-                    for tx in block['transactions']:
-                        print(f"  {tx['sender']} -> {tx['recipient']}: {tx['amount']} coins")
-            else:
-                print(f"❌ Failed to get chain. Status code: {response.status_code}")
+            chain_data = self.chain_cache.get_chain(self.node_url)
+            print("\n📦 Blockchain:")
+            print(f"Length: {chain_data['length']} blocks")
+            
+            for block in chain_data['chain']:
+                print(f"\nBlock #{block['index']}")
+                print(f"Previous Hash: {block['previous_hash']}")
+                print(f"Proof: {block['proof']}")
+                print("Transactions:")
+                for tx in block['transactions']:
+                    print(f"  {tx['sender']} -> {tx['recipient']}: {tx['amount']} coins")
                 
         except requests.exceptions.ConnectionError:
             print("❌ Could not connect to node. Is the blockchain node running?")
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Failed to get chain. Status code: {e.response.status_code}")
         except Exception as e:
             print(f"❌ Error: {str(e)}")
 
@@ -180,20 +210,31 @@ class BlockchainCLI(cmd.Cmd):
         except Exception as e:
             print(f"❌ Error loading wallet: {e}")
 
+    def do_load_hd(self, arg):
+        'Use a wallet derived from an HD seed file: load_hd <filename> [index]'
+        args = arg.split()
+        filename = args[0] if args else 'hd_wallet.seed'
+        try:
+            index = int(args[1]) if len(args) > 1 else 0
+            hd = HDWallet.load_from_file(filename)
+            self.wallet = hd.derive(index)
+            print(f"✅ Wallet {hd.path(index)} derived from {filename}")
+            print(f"   Address: {self.wallet.address}")
+        except Exception as e:
+            print(f"❌ Error deriving wallet: {e}")
+
     def do_status(self, arg):
         'Show blockchain status'
         try:
-            response = requests.get(f"{self.node_url}/chain")
-            if response.status_code == 200:
-                chain_data = response.json()
-                print("\n📊 Blockchain Status:")
-                print(f"Chain length: {chain_data['length']} blocks")
-                print(f"Latest block: #{chain_data['chain'][-1]['index']}")
-                print(f"Total transactions: {sum(len(block['transactions']) for block in chain_data['chain'])}")
-            else:
-                print("❌ Failed to get blockchain status")
+            chain_data = self.chain_cache.get_chain(self.node_url)
+            print("\n📊 Blockchain Status:")
+            print(f"Chain length: {chain_data['length']} blocks")
+            print(f"Latest block: #{chain_data['chain'][-1]['index']}")
+            print(f"Total transactions: {sum(len(block['transactions']) for block in chain_data['chain'])}")
         except requests.exceptions.ConnectionError:
             print("❌ Could not connect to node. Is the blockchain node running?")
+        except requests.exceptions.HTTPError:
+            print("❌ Failed to get blockchain status")
         except Exception as e:
             print(f"❌ Error: {str(e)}")
 
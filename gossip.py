@@ -0,0 +1,174 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import peer_client
+from chainlog import get_logger
+
+logger = get_logger('gossip')
+
+
+class SeenCache:
+    """Bounded LRU set of item ids this node has already handled"""
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """Mark ``key`` as seen; return False if it was already present"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return False
+            self._items[key] = True
+            if len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+            return True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+
+class Gossip:
+    """Push-based propagation of new blocks and transactions.
+
+    When the local Blockchain accepts a block or transaction, an inventory
+    message (kind, id, origin) is posted to every known peer. A peer that has
+    not seen the id fetches just that item from the origin, validates it, and
+    announces it onward. Seen caches on both sides stop rebroadcast loops.
+    Announcements are only acted on when the origin is a registered peer, and
+    the consensus fallback for forks runs at most once per ``resolve_interval``.
+    """
+
+    def __init__(self, blockchain, self_url, max_workers=8, cache_size=10000, timeout=2,
+                 resolve_interval=10):
+        self.blockchain = blockchain
+        self.self_url = self_url.rstrip('/')
+        self.timeout = timeout
+        self.resolve_interval = resolve_interval
+        self.seen = SeenCache(cache_size)
+        self._resolve_lock = threading.Lock()
+        self._last_resolve = None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gossip')
+        blockchain.add_listener(self.on_accepted)
+
+    def on_accepted(self, kind, item):
+        """Blockchain listener: announce locally accepted items"""
+        if kind == 'block':
+            self.announce('block', self.blockchain.hash(item), index=item['index'])
+        elif kind == 'transaction' and item['sender'] != "0":
+            # Mining rewards are unsigned and only valid inside the miner's own block
+            self.announce('transaction', item['txid'])
+
+    def announce(self, kind, item_id, index=None):
+        self.seen.add((kind, item_id))
+        inv = {'type': kind, 'id': item_id, 'origin': self.self_url}
+        if index is not None:
+            inv['index'] = index
+        for peer in self.blockchain.store.get_nodes():
+            if peer.rstrip('/') != self.self_url:
+                self.executor.submit(self._send, peer, inv)
+
+    def _send(self, peer, inv):
+        try:
+            peer_client.post(f"{peer.rstrip('/')}/gossip/inv", json=inv, timeout=self.timeout)
+        except Exception as e:
+            logger.warning("Gossip to %s failed: %s", peer, e, extra={'sample_every': 10})
+
+    def is_peer(self, origin):
+        """True if ``origin`` is one of our registered nodes"""
+        return origin.rstrip('/') in {node.rstrip('/') for node in self.blockchain.store.get_nodes()}
+
+    def handle_inv(self, inv):
+        """Handle an inventory message from a peer; returns 'known', 'queued' or 'ignored'"""
+        kind = inv.get('type')
+        item_id = inv.get('id')
+        origin = inv.get('origin')
+        if kind not in ('block', 'transaction') or not item_id or not isinstance(origin, str) or not origin:
+            raise ValueError("Inventory needs type, id and origin")
+        if not self.is_peer(origin):
+            # Never fetch from (or mark ids seen on behalf of) an unregistered origin
+            logger.debug("Ignoring inventory from unregistered origin %s", origin, extra={'sample_every': 10})
+            return 'ignored'
+        if not self.seen.add((kind, item_id)):
+            return 'known'
+
+        if kind == 'block':
+            index = int(inv.get('index', 0))
+            if index <= self.blockchain.chain_length:
+                return 'known'
+            self.executor.submit(self._fetch_blocks, origin.rstrip('/'), item_id, index)
+        else:
+            if self.blockchain.known_transaction(item_id):
+                return 'known'
+            self.executor.submit(self._fetch_transaction, origin.rstrip('/'), item_id)
+        return 'queued'
+
+    def _fetch_blocks(self, origin, block_id, index):
+        """Pull the blocks between our tip and ``index`` from the announcing peer"""
+        try:
+            start = self.blockchain.chain_length + 1
+            if index == start:
+                response = peer_client.get(f"{origin}/blocks/{index}", timeout=self.timeout)
+                response.raise_for_status()
+                payloads = [response.content]
+            else:
+                response = peer_client.get(f"{origin}/chain/stream?start={start}", timeout=self.timeout * 5)
+                response.raise_for_status()
+                payloads = [line for line in response.content.splitlines() if line]
+
+            for payload in payloads:
+                block = json.loads(payload)
+                if not self.blockchain.add_block(block):
+                    # Doesn't extend our tip: we are on a fork, fall back to consensus
+                    self._resolve()
+                    return
+            if self.blockchain.hash(self.blockchain.get_last_block()) != block_id:
+                logger.warning("Tip from %s does not match announced block %s", origin, block_id)
+        except Exception as e:
+            logger.warning("Block fetch from %s failed: %s", origin, e)
+        finally:
+            # Gossip threads never see a request teardown; hand the session back here
+            self.blockchain.store.release()
+
+    def _resolve(self):
+        """Run resolve_conflicts unless another run is in progress or one finished recently"""
+        if not self._resolve_lock.acquire(blocking=False):
+            return False
+        try:
+            now = time.monotonic()
+            if self._last_resolve is not None and now - self._last_resolve < self.resolve_interval:
+                return False
+            self._last_resolve = now
+            return self.blockchain.resolve_conflicts()
+        finally:
+            self._resolve_lock.release()
+
+    def _fetch_transaction(self, origin, txid):
+        try:
+            response = peer_client.get(f"{origin}/transactions/{txid}", timeout=self.timeout)
+            if response.status_code == 404:
+                return  # Already mined on the origin
+            response.raise_for_status()
+            tx = response.json()
+            if tx['sender'] == "0":
+                return
+            self.blockchain.new_transaction(
+                sender=tx['sender'],
+                recipient=tx['recipient'],
+                amount=tx['amount'],
+                signature=tx['signature'],
+                public_key=tx['public_key'],
+                timestamp=tx['timestamp'],
+                version=tx.get('version')
+            )
+        except ValueError as e:
+            logger.debug("Rejected transaction %s: %s", txid, e)
+        except Exception as e:
+            logger.warning("Transaction fetch from %s failed: %s", origin, e)
+        finally:
+            self.blockchain.store.release()
@@ -0,0 +1,116 @@
+"""Hierarchical deterministic Ed25519 wallets (SLIP-10).
+
+One 32-byte seed yields any number of wallets:
+
+    m/44'/1'/<account>'/<index>'
+
+SLIP-10 Ed25519 only defines hardened derivation, so every level is
+hardened. The account node is derived once and cached, so each further
+address costs one HMAC-SHA512 plus the public key. Back up the seed file
+once and every address can be restored from it. Keys are derived on demand
+and never written out individually.
+"""
+import hashlib
+import hmac
+import json
+import os
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from wallet import Wallet
+
+HARDENED = 0x80000000
+COIN_TYPE = 1  # SLIP-44 "testnet (all coins)"
+SEED_BYTES = 32
+CURVE_KEY = b'ed25519 seed'
+
+
+def master_node(seed):
+    """(key, chain code) for the root of the tree"""
+    digest = hmac.new(CURVE_KEY, seed, hashlib.sha512).digest()
+    return digest[:32], digest[32:]
+
+
+def child_node(node, index):
+    """Hardened child ``index`` of ``node``"""
+    key, chain_code = node
+    data = b'\x00' + key + (index | HARDENED).to_bytes(4, 'big')
+    digest = hmac.new(chain_code, data, hashlib.sha512).digest()
+    return digest[:32], digest[32:]
+
+
+def parse_path(path):
+    """'m/44'/1'/0'' -> [44, 1, 0]; every level must be hardened"""
+    parts = path.split('/')
+    if parts[0] != 'm':
+        raise ValueError(f"Derivation path must start with m: {path}")
+    indexes = []
+    for part in parts[1:]:
+        if not part.endswith(("'", 'h')) or not part[:-1].isdigit():
+            raise ValueError(f"Ed25519 derivation supports hardened indexes only: {part}")
+        index = int(part[:-1])
+        if index >= HARDENED:
+            raise ValueError(f"Derivation index out of range: {part}")
+        indexes.append(index)
+    return indexes
+
+
+def derive_node(seed, path):
+    node = master_node(seed)
+    for index in parse_path(path):
+        node = child_node(node, index)
+    return node
+
+
+class HDWallet:
+    def __init__(self, seed=None, account=0):
+        self.seed = os.urandom(SEED_BYTES) if seed is None else bytes(seed)
+        if not 16 <= len(self.seed) <= 64:
+            raise ValueError("Seed must be 16 to 64 bytes")
+        self.account = account
+        self.account_path = f"m/44'/{COIN_TYPE}'/{account}'"
+        self._account_node = derive_node(self.seed, self.account_path)
+
+    def path(self, index):
+        return f"{self.account_path}/{index}'"
+
+    def private_key(self, index):
+        if not 0 <= index < HARDENED:
+            raise ValueError(f"Derivation index out of range: {index}")
+        key, _ = child_node(self._account_node, index)
+        return ed25519.Ed25519PrivateKey.from_private_bytes(key)
+
+    def derive(self, index):
+        """The Wallet at ``index`` in this account"""
+        return Wallet(self.private_key(index))
+
+    def address(self, index):
+        return self.derive(index).address
+
+    def addresses(self, start=0, count=1):
+        """(index, address) pairs for ``count`` consecutive indexes"""
+        return [(index, self.address(index)) for index in range(start, start + count)]
+
+    def find(self, address, limit=10000):
+        """Index of ``address`` among the first ``limit`` indexes, or None"""
+        for index in range(limit):
+            if self.address(index) == address:
+                return index
+        return None
+
+    def save_to_file(self, filename):
+        """Save the seed (the only secret needed to restore every address)"""
+        data = {
+            'type': 'hd',
+            'scheme': 'ed25519',
+            'seed': self.seed.hex(),
+            'account': self.account
+        }
+        with open(filename, 'w') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load_from_file(cls, filename):
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        if data.get('type') != 'hd':
+            raise ValueError(f"{filename} is not an HD wallet seed file")
+        return cls(bytes.fromhex(data['seed']), data.get('account', 0))
@@ -0,0 +1,123 @@
+"""Background pool of pre-generated RSA wallet keys.
+
+RSA-2048 generation takes tens to hundreds of milliseconds, so wallet
+creation in bursts stalls on it. A KeyPool keeps a buffer of keys filled by
+worker processes; ``get()`` hands one out immediately and tops the buffer
+back up. When the buffer is empty it falls back to generating inline.
+
+Sized by WALLET_KEYPOOL_SIZE (default 32) and WALLET_KEYPOOL_WORKERS
+(default 2).
+"""
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from chainlog import get_logger
+from metrics import REGISTRY
+
+KEY_SIZE = 2048
+PUBLIC_EXPONENT = 65537
+
+logger = get_logger('keypool')
+
+REQUESTS = REGISTRY.counter('wallet_keypool_requests_total', 'Keys handed out by source', ['source'])
+
+
+def generate_key(key_size=KEY_SIZE):
+    return rsa.generate_private_key(public_exponent=PUBLIC_EXPONENT, key_size=key_size)
+
+
+def _generate_der(key_size):
+    """Worker process entry point; keys cross the process boundary as PKCS8 DER"""
+    return generate_key(key_size).private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+
+
+def _load_der(der):
+    try:
+        # We generated the key ourselves, so skip the slow RSA consistency check
+        return serialization.load_der_private_key(der, password=None, unsafe_skip_rsa_key_validation=True)
+    except TypeError:  # cryptography < 39
+        return serialization.load_der_private_key(der, password=None)
+
+
+class KeyPool:
+    def __init__(self, size=32, workers=2, key_size=KEY_SIZE):
+        self.size = size
+        self.workers = workers
+        self.key_size = key_size
+        self.keys = queue.Queue(maxsize=size)
+        self._executor = None
+        self._inflight = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker processes and begin filling the buffer (idempotent)"""
+        if multiprocessing.parent_process() is not None:
+            return self  # Never nest pools inside our own worker processes
+        with self._lock:
+            if self._executor is None and not self._closed:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._refill()
+        return self
+
+    def _refill(self):
+        # Caller holds self._lock
+        while self._executor is not None and self.keys.qsize() + self._inflight < self.size:
+            future = self._executor.submit(_generate_der, self.key_size)
+            self._inflight += 1
+            future.add_done_callback(self._on_generated)
+
+    def _on_generated(self, future):
+        with self._lock:
+            self._inflight -= 1
+        try:
+            key = _load_der(future.result())
+        except Exception as e:
+            if not self._closed:
+                logger.warning("Key generation failed: %s", e)
+            return
+        try:
+            self.keys.put_nowait(key)
+        except queue.Full:
+            pass
+
+    def get(self):
+        """Return a private key, from the buffer when one is ready"""
+        self.start()
+        try:
+            key = self.keys.get_nowait()
+            REQUESTS.inc(source='pool')
+        except queue.Empty:
+            key = generate_key(self.key_size)
+            REQUESTS.inc(source='inline')
+        with self._lock:
+            if not self._closed:
+                self._refill()
+        return key
+
+    def available(self):
+        return self.keys.qsize()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+default_pool = KeyPool(
+    size=int(os.environ.get('WALLET_KEYPOOL_SIZE', 32)),
+    workers=int(os.environ.get('WALLET_KEYPOOL_WORKERS', 2))
+)
+
+REGISTRY.gauge('wallet_keypool_available', 'Pre-generated keys ready in the pool',
+               function=default_pool.available)
@@ -19,7 +19,7 @@ def main():
     print(json.dumps(block, indent=2))
     
     # Verify the blockchain
-    print("\nBlockchain valid?", blockchain.is_chain_valid(blockchain.chain))
+    print("\nBlockchain valid?", blockchain.is_chain_valid(blockchain.get_chain()))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
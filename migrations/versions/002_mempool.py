@@ -0,0 +1,42 @@
+"""Shared mempool and chain epoch
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Pending transactions shared by all worker processes
+    op.create_table('mempool',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('txid', sa.String(), nullable=False),
+        sa.Column('sender', sa.String(), nullable=False),
+        sa.Column('recipient', sa.String(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('timestamp', sa.Float(), nullable=False),
+        sa.Column('signature', sa.String(), nullable=True),
+        sa.Column('public_key', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('txid')
+    )
+
+    # Bumped on chain replacement so workers drop cached block hashes
+    op.create_table('chain_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('epoch', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO chain_state (id, epoch) VALUES (1, 0)")
+
+def downgrade():
+    op.drop_table('chain_state')
+    op.drop_table('mempool')
@@ -0,0 +1,45 @@
+"""Store amounts as integer base units
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+# 1 coin = 10**8 base units (units.COIN)
+COIN = 100000000
+
+def upgrade():
+    # Block hashes are computed from the float amounts, so every stored amount
+    # must convert to whole base units and back without changing
+    conn = op.get_bind()
+    for table in ('transactions', 'mempool'):
+        inexact = conn.execute(sa.text(
+            f"SELECT COUNT(*) FROM {table} "
+            f"WHERE ABS(amount * {COIN} - ROUND(amount * {COIN})) > 0.001"
+        )).scalar()
+        if inexact:
+            raise RuntimeError(f"{inexact} rows in {table} have amounts with more than 8 decimal places")
+
+    for table, nullable in (('transactions', True), ('mempool', False)):
+        op.alter_column(table, 'amount',
+                        existing_type=sa.Float(),
+                        type_=sa.BigInteger(),
+                        existing_nullable=nullable,
+                        postgresql_using=f'ROUND(amount * {COIN})::bigint')
+
+def downgrade():
+    for table, nullable in (('transactions', True), ('mempool', False)):
+        op.alter_column(table, 'amount',
+                        existing_type=sa.BigInteger(),
+                        type_=sa.Float(),
+                        existing_nullable=nullable,
+                        postgresql_using=f'amount::double precision / {COIN}')
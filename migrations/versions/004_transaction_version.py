@@ -0,0 +1,22 @@
+"""Signed message version on pending transactions
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing rows were signed with the original (version 1) message
+    op.add_column('mempool', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+def downgrade():
+    op.drop_column('mempool', 'version')
@@ -0,0 +1,24 @@
+"""Transaction ids on confirmed transactions
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Rows confirmed before this migration keep a NULL txid; the unique index allows many NULLs
+    op.add_column('transactions', sa.Column('txid', sa.String(length=64), nullable=True))
+    op.create_index('ix_transactions_txid', 'transactions', ['txid'], unique=True)
+
+def downgrade():
+    op.drop_index('ix_transactions_txid', table_name='transactions')
+    op.drop_column('transactions', 'txid')
@@ -0,0 +1,26 @@
+"""Block timestamps as the float Unix time they are hashed with
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing values were written with datetime.fromtimestamp, in the node's local time and
+    # cut to whole microseconds; this assumes the session TimeZone matches that local time.
+    # Digits already lost stay lost: resync such nodes from a peer (/nodes/resolve).
+    op.alter_column('blocks', 'timestamp', type_=sa.Float(), existing_type=sa.DateTime(),
+                    postgresql_using="EXTRACT(EPOCH FROM timestamp AT TIME ZONE current_setting('TimeZone'))")
+
+def downgrade():
+    op.alter_column('blocks', 'timestamp', type_=sa.DateTime(), existing_type=sa.Float(),
+                    postgresql_using="to_timestamp(timestamp) AT TIME ZONE current_setting('TimeZone')")
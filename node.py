@@ -1,16 +1,119 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from blockchain import Blockchain
-from models import Node, Block, Transaction
+from storage import StaleBlockError
 from uuid import uuid4
 import requests
 from urllib.parse import urlparse
 import os
 import traceback
+import gzip
+import json
+import threading
+import wire
+import metrics
+from gossip import Gossip
+import chainlog
+import profiling
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+chainlog.configure()
+logger = chainlog.get_logger('node')
 
 # Initialize Flask app
 app = Flask(__name__)
 node_identifier = str(uuid4()).replace('-', '')
 blockchain = Blockchain()
+gossip = Gossip(blockchain, os.environ.get('NODE_URL', f"http://localhost:{os.environ.get('PORT', 5000)}"))
+
+# Largest batch accepted by /transactions/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 5000))
+
+metrics.REGISTRY.gauge('blockchain_chain_height', 'Height of the local chain',
+                       function=lambda: blockchain.get_last_block()['index'])
+metrics.REGISTRY.gauge('blockchain_mempool_size', 'Pending transactions awaiting a block',
+                       function=lambda: blockchain.store.pending_count())
+metrics.REGISTRY.gauge('blockchain_db_pool_connections', 'Database connection pool usage', ['state'],
+                       function=lambda: {(state,): value for state, value in
+                                         (blockchain.store.pool_status() or {}).items()} or None)
+
+profiling.install(app, blockchain)
+
+@app.teardown_appcontext
+def release_store(exc):
+    """Hand the request's database session back to the pool"""
+    blockchain.store.release()
+
+def wants_binary():
+    """True when the client asked for the compact binary wire format"""
+    best = request.accept_mimetypes.best_match(['application/json', wire.MIMETYPE])
+    return best == wire.MIMETYPE
+
+# Encoded /chain bodies for the current tip, keyed by (format, encoding)
+chain_cache = {'tip': None, 'bodies': {}}
+chain_cache_lock = threading.Lock()
+
+def chain_tip(last_block):
+    """Chain version derived from chain height and tip hash"""
+    return f'{last_block["index"]}-{blockchain.hash(last_block)}'
+
+def chain_etag(tip, fmt, encoding):
+    """Strong validator for one representation: each format and content coding gets its own"""
+    kind = 'bin' if fmt == wire.MIMETYPE else 'json'
+    return f'{tip}-{kind}-{encoding}'
+
+def pick_encoding():
+    accepted = request.accept_encodings
+    if zstandard is not None and accepted['zstd']:
+        return 'zstd'
+    if accepted['gzip']:
+        return 'gzip'
+    return 'identity'
+
+def compress(body, encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=5)
+    return body
+
+def cached_chain_response():
+    """Serve /chain with ETag revalidation, reusing the encoded body until the tip changes"""
+    tip = chain_tip(blockchain.get_last_block())
+    fmt = wire.MIMETYPE if wants_binary() else 'application/json'
+    encoding = pick_encoding()
+    etag = chain_etag(tip, fmt, encoding)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        with chain_cache_lock:
+            if chain_cache['tip'] != tip:
+                chain_cache['tip'] = tip
+                chain_cache['bodies'] = {}
+            body = chain_cache['bodies'].get((fmt, encoding))
+        if body is None:
+            chain = blockchain.get_chain()
+            # The tip may have moved since the validator was computed
+            tip = chain_tip(chain[-1])
+            etag = chain_etag(tip, fmt, encoding)
+            with profiling.span('serialize'):
+                if fmt == wire.MIMETYPE:
+                    raw = wire.encode_chain(chain)
+                else:
+                    raw = json.dumps({'chain': chain, 'length': len(chain)}).encode()
+                body = compress(raw, encoding)
+            with chain_cache_lock:
+                if chain_cache['tip'] == tip:
+                    chain_cache['bodies'][(fmt, encoding)] = body
+        response = Response(body, mimetype=fmt)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    return response
 
 @app.route('/mine', methods=['GET'])
 def mine():
@@ -24,40 +127,21 @@ def mine():
         last_block = blockchain.get_last_block()
         proof = blockchain.proof_of_work(last_block)
         
-        # Reward the miner
-        blockchain.new_transaction(
-            sender="0",  # 0 signifies mining reward
-            recipient=miner_address,
-            amount=1.0, 
-            signature=None  
-        )
-        
-        # Create the new block
+        # Create the new block, rewarding the miner
         previous_hash = blockchain.hash(last_block)
-        block = blockchain.create_block(proof, previous_hash)
-
-        block_data = {
-            'index': block.index,
-            'timestamp': block.timestamp.timestamp(),
-            'proof': block.proof,
-            'previous_hash': block.previous_hash,
-            'transactions': [
-                {
-                    'sender': tx.sender,
-                    'recipient': tx.recipient,
-                    'amount': tx.amount
-                } for tx in block.transactions
-            ]
-        }
-        
+        block = blockchain.create_block(proof, previous_hash, reward_address=miner_address, reward=1.0)
+
         return jsonify({
             'message': "New Block Mined",
-            'block': block_data
+            'block': block
         }), 200
-        
+
+    except StaleBlockError as e:
+        # Another worker or peer extended the chain while we were mining
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         error_traceback = traceback.format_exc()
-        print(f"Error in mining: {error_traceback}")
+        logger.error("Error in mining: %s", error_traceback)
         return jsonify({
             "error": str(e),
             "traceback": error_traceback
@@ -66,7 +150,14 @@ def mine():
 @app.route('/transactions/new', methods=['POST'])
 def new_transaction():
     try:
-        values = request.get_json()
+        if wire.is_binary(request.content_type):
+            try:
+                with profiling.span('serialize'):
+                    values = wire.decode_transaction(request.get_data())
+            except wire.WireError as e:
+                return jsonify({'error': f'Malformed transaction: {str(e)}'}), 400
+        else:
+            values = request.get_json()
         
         # Check required fields
         required = ['sender', 'recipient', 'amount', 'timestamp', 'signature', 'public_key']
@@ -85,7 +176,10 @@ def new_transaction():
                 recipient=values['recipient'],
                 amount=values['amount'],
                 signature=values['signature'],
-                public_key=values['public_key']
+                public_key=values['public_key'],
+                timestamp=values['timestamp'],
+                scheme=values.get('scheme'),
+                version=values.get('version')
             )
             
             response = {
@@ -106,18 +200,136 @@ def new_transaction():
     except Exception as e:
         return jsonify({'error': f"Request failed: {str(e)}"}), 500
 
+@app.route('/transactions/batch', methods=['POST'])
+def new_transactions():
+    """Admit a batch of signed transactions; each one is accepted or rejected on its own"""
+    values = request.get_json(silent=True) or {}
+    transactions = values.get('transactions')
+    if not isinstance(transactions, list):
+        return jsonify({'error': 'Expected a JSON object with a transactions list'}), 400
+    if len(transactions) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} transactions per batch'}), 413
+
+    required = ['sender', 'recipient', 'amount', 'timestamp', 'signature', 'public_key']
+    results = []
+    # Spendable units per sender, summed once and drawn down as the batch is admitted
+    budget = {}
+    for tx in transactions:
+        if not isinstance(tx, dict) or not all(k in tx for k in required):
+            results.append({'status': 400, 'error': 'Missing values'})
+            continue
+        try:
+            index = blockchain.new_transaction(
+                sender=tx['sender'],
+                recipient=tx['recipient'],
+                amount=tx['amount'],
+                signature=tx['signature'],
+                public_key=tx['public_key'],
+                timestamp=tx['timestamp'],
+                scheme=tx.get('scheme'),
+                version=tx.get('version'),
+                budget=budget
+            )
+            results.append({'status': 201, 'block': index})
+        except ValueError as e:
+            results.append({'status': 400, 'error': str(e)})
+        except Exception as e:
+            results.append({'status': 500, 'error': f"Transaction failed: {str(e)}"})
+
+    accepted = sum(1 for result in results if result['status'] == 201)
+    return jsonify({
+        'accepted': accepted,
+        'rejected': len(results) - accepted,
+        'results': results
+    }), 200
+
+@app.route('/transactions/<txid>', methods=['GET'])
+def get_transaction(txid):
+    """Return a pending transaction so peers can fetch announced ids"""
+    tx = blockchain.get_pending_transaction(txid)
+    if tx is None:
+        return jsonify({'error': 'Transaction not pending'}), 404
+    return jsonify(tx), 200
+
+@app.route('/gossip/inv', methods=['POST'])
+def gossip_inventory():
+    """Receive a block or transaction announcement from a peer"""
+    try:
+        status = gossip.handle_inv(request.get_json() or {})
+        return jsonify({'status': status}), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/chain', methods=['GET'])
 def full_chain():
     try:
-        chain = blockchain.get_chain()
-        response = {
-            'chain': chain,
-            'length': len(chain)
-        }
-        return jsonify(response), 200
+        return cached_chain_response()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/chain/head', methods=['GET'])
+def chain_head():
+    """Cheap summary of the chain tip for health checks and discovery"""
+    last_block = blockchain.get_last_block()
+    return jsonify({
+        'length': last_block['index'],
+        'tip_hash': blockchain.hash(last_block),
+        'timestamp': last_block['timestamp'],
+        'pending': blockchain.store.pending_count()
+    }), 200
+
+@app.route('/chain/hashes', methods=['GET'])
+def chain_hashes():
+    """Block hashes at ?heights=1,50,100 for cross-node audits"""
+    try:
+        heights = [int(h) for h in request.args.get('heights', '').split(',') if h]
+    except ValueError:
+        return jsonify({'error': 'heights must be a comma-separated list of integers'}), 400
+    if len(heights) > 1000:
+        return jsonify({'error': 'At most 1000 heights per request'}), 400
+    hashes = {str(height): block_hash for height, block_hash in blockchain.block_hashes(heights).items()}
+    return jsonify({'length': blockchain.chain_length, 'hashes': hashes}), 200
+
+@app.route('/chain/checkpoints', methods=['GET'])
+def chain_checkpoints():
+    """Block hashes at every multiple of ?interval= (default 1000)"""
+    interval = request.args.get('interval', 1000, type=int)
+    if interval < 1:
+        return jsonify({'error': 'interval must be positive'}), 400
+    return jsonify({
+        'interval': interval,
+        'length': blockchain.chain_length,
+        'checkpoints': blockchain.checkpoints(interval)
+    }), 200
+
+@app.route('/blocks/<int:index>', methods=['GET'])
+def get_block(index):
+    """Return a single block as stored, without re-serializing it"""
+    try:
+        data = blockchain.get_block_bytes(index)
+        if data is None:
+            return jsonify({"error": f"Block {index} not found"}), 404
+        return Response(data, mimetype='application/json')
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/chain/stream', methods=['GET'])
+def stream_chain():
+    """Stream blocks from ?start=<index> to the tip as newline-delimited JSON"""
+    start = request.args.get('start', 1, type=int)
+
+    def generate():
+        for data in blockchain.iter_chain_bytes(start):
+            yield data
+            yield b'\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of node metrics"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/nodes/register', methods=['POST'])
 def register_nodes():
     try:
@@ -142,13 +354,13 @@ def register_nodes():
             'message': 'Nodes registration completed',
             'registered_nodes': registered_nodes,
             'errors': errors,
-            'total_nodes': [node.address for node in blockchain.db.query(Node).all()]
+            'total_nodes': blockchain.store.get_nodes()
         }
         return jsonify(response), 201
         
     except Exception as e:
         error_traceback = traceback.format_exc()
-        print(f"Error in register_nodes: {error_traceback}")
+        logger.error("Error in register_nodes: %s", error_traceback)
         return jsonify({
             "error": str(e),
             "traceback": error_traceback
@@ -159,6 +371,12 @@ def consensus():
     try:
         replaced = blockchain.resolve_conflicts()
         
+        message = 'Our chain was replaced' if replaced else 'Our chain is authoritative'
+        if request.args.get('brief'):
+            return jsonify({'message': message, 'length': blockchain.chain_length}), 200
+        if wants_binary():
+            return Response(wire.encode_chain(blockchain.get_chain(), message), mimetype=wire.MIMETYPE)
+
         if replaced:
             response = {
                 'message': 'Our chain was replaced',
@@ -174,5 +392,6 @@ def consensus():
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
+    # Development server; use serve.py for production
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port) 
\ No newline at end of file
@@ -3,75 +3,204 @@ import time
 from urllib.parse import urljoin
 import socket
 import threading
+import asyncio
+import argparse
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
+import peer_client
+
+# Spacing of the checkpoint hashes nodes publish for consistency audits
+CHECKPOINT_INTERVAL = 1000
+
+class LatencyHistogram:
+    """Rolling latency percentiles over the most recent samples"""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
 
 class NodeManager:
-    def __init__(self, base_ports=range(5000, 5010)):
-        self.nodes = set()
+    def __init__(self, base_ports=range(5000, 5010), hosts=("localhost",), nodes=None,
+                 timeout=2, interval=10, max_concurrency=256, max_workers=16):
+        self.nodes = set(nodes or [])
         self.base_ports = base_ports
+        self.hosts = hosts
+        self.timeout = timeout
+        self.interval = interval
+        self.max_concurrency = max_concurrency
+        self.max_workers = max_workers
         self.health_data = {}
+        self.latency = defaultdict(LatencyHistogram)
+        self.last_sweep_time = None
         self.monitoring = False
+        # Probes fail fast: no retries, one timeout per node
+        self.probe_client = peer_client.PeerClient(timeout=timeout, retries=0)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def candidate_urls(self):
+        """Every host/port combination to probe, plus explicitly configured nodes"""
+        urls = {f"http://{host}:{port}" for host in self.hosts for port in self.base_ports}
+        return sorted(urls | self.nodes)
+
+    def _get_head(self, url):
+        """Fetch the lightweight /chain/head summary, falling back to /chain for older nodes"""
+        response = self.probe_client.get(urljoin(url, "chain/head"))
+        if response.status_code == 404:
+            response = self.probe_client.get(urljoin(url, "chain"))
+            response.raise_for_status()
+            return {'length': response.json()['length'], 'pending': None}
+        response.raise_for_status()
+        return response.json()
+
+    async def _probe(self, url):
+        """Return (url, head or None, elapsed seconds) without ever raising"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            head = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, self._get_head, url),
+                timeout=self.timeout + 1
+            )
+        except (asyncio.TimeoutError, requests.exceptions.RequestException, ValueError, KeyError):
+            head = None
+        return url, head, time.perf_counter() - started
+
+    async def _probe_all(self, urls):
+        return await asyncio.gather(*(self._probe(url) for url in urls))
 
     def discover_nodes(self):
-        """Automatically discover nodes running on local ports"""
+        """Probe every candidate host/port concurrently and remember the ones that answer"""
         print("Discovering nodes...")
         
-        for port in self.base_ports:
-            url = f"http://localhost:{port}"
-            try:
-                response = requests.get(
-                    urljoin(url, "chain"),
-                    timeout=2
-                )
-                if response.status_code == 200:
-                    self.nodes.add(url)
-                    print(f"✅ Discovered node at {url}")
-            except requests.exceptions.RequestException:
-                pass
+        for url, head, _ in asyncio.run(self._probe_all(self.candidate_urls())):
+            if head is not None and url not in self.nodes:
+                self.nodes.add(url)
+                print(f"✅ Discovered node at {url}")
         
         return list(self.nodes)
 
+    async def _fan_out(self, nodes, call):
+        """Run ``call(node)`` for every node on a bounded pool; never raises"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def run(node):
+            async with semaphore:
+                try:
+                    return node, await loop.run_in_executor(self.executor, call, node), None
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    return node, None, e
+
+        return await asyncio.gather(*(run(node) for node in nodes))
+
+    def _register_peers(self, node):
+        other_nodes = [n for n in self.nodes if n != node]
+        response = peer_client.post(
+            urljoin(node, "nodes/register"),
+            json={"nodes": other_nodes},
+            timeout=5
+        )
+        return response.status_code == 201
+
     def connect_nodes(self):
         """Connect all discovered nodes to each other"""
         print("\nConnecting nodes...")
+        started = time.perf_counter()
         
-        for node in self.nodes:
-            try:
-                other_nodes = [n for n in self.nodes if n != node]
-                response = requests.post(
-                    urljoin(node, "nodes/register"),
-                    json={"nodes": other_nodes},
-                    timeout=5
-                )
-                
-                if response.status_code == 201:
-                    print(f"✅ Connected {node} to peer nodes")
-                else:
-                    print(f"❌ Failed to connect {node}")
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Error connecting {node}: {str(e)}")
+        connected = failed = 0
+        for node, ok, error in asyncio.run(self._fan_out(sorted(self.nodes), self._register_peers)):
+            if error is not None:
+                print(f"❌ Error connecting {node}: {str(error)}")
+                failed += 1
+            elif ok:
+                print(f"✅ Connected {node} to peer nodes")
+                connected += 1
+            else:
+                print(f"❌ Failed to connect {node}")
+                failed += 1
+
+        print(f"\nConnected {connected}/{len(self.nodes)} nodes, {failed} failed "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    def _block_hashes(self, node, heights):
+        """Fetch block hashes at ``heights`` from ``node`` as {height: hash}"""
+        response = peer_client.get(
+            urljoin(node, "chain/hashes"),
+            params={'heights': ','.join(str(h) for h in heights)},
+            timeout=5
+        )
+        response.raise_for_status()
+        return {int(height): block_hash for height, block_hash in response.json()['hashes'].items()}
+
+    def _checkpoints(self, node, interval):
+        response = peer_client.get(
+            urljoin(node, "chain/checkpoints"),
+            params={'interval': interval},
+            timeout=5
+        )
+        response.raise_for_status()
+        return response.json()['checkpoints']
+
+    def find_divergence(self, reference, node, height, interval=CHECKPOINT_INTERVAL):
+        """Return the first height at which ``node`` disagrees with ``reference``, or None.
+
+        Only heights up to ``height`` are compared. A block hash commits to
+        every block before it, so one matching hash proves the whole prefix
+        matches: checkpoints narrow the search to one interval, then a binary
+        search over single heights finds the exact block in O(log n) requests.
+        """
+        if self._block_hashes(reference, [height]) == self._block_hashes(node, [height]):
+            return None
+
+        # lo always agrees (height 0 is the empty prefix), hi always disagrees
+        lo, hi = 0, height
+        ref_checkpoints = self._checkpoints(reference, interval)
+        node_checkpoints = self._checkpoints(node, interval)
+        for i, (ref_hash, node_hash) in enumerate(zip(ref_checkpoints, node_checkpoints)):
+            checkpoint = (i + 1) * interval
+            if checkpoint >= height:
+                break
+            if ref_hash == node_hash:
+                lo = checkpoint
+            else:
+                hi = checkpoint
+                break
+
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self._block_hashes(reference, [mid]) == self._block_hashes(node, [mid]):
+                lo = mid
+            else:
+                hi = mid
+        return hi
 
     def verify_chain_consistency(self):
-        """Verify that all nodes have consistent blockchain data"""
+        """Verify that all nodes have consistent blockchain data using tip and checkpoint hashes"""
         print("\nVerifying chain consistency...")
         
-        chains = {}
-        for node in self.nodes:
-            try:
-                response = requests.get(urljoin(node, "chain"), timeout=5)
-                if response.status_code == 200:
-                    chains[node] = response.json()
-            except requests.exceptions.RequestException:
-                print(f"❌ Could not get chain from {node}")
+        heads = {}
+        for node, head, _ in asyncio.run(self._probe_all(sorted(self.nodes))):
+            if head is None or 'tip_hash' not in head:
+                print(f"❌ Could not get chain head from {node}")
                 continue
+            heads[node] = head
 
         # Compare chain lengths and content
-        if not chains:
+        if not heads:
             print("No chains available for verification")
             return
 
-        lengths = {node: data['length'] for node, data in chains.items()}
+        lengths = {node: head['length'] for node, head in heads.items()}
         max_length = max(lengths.values())
         
         print("\nChain lengths:")
@@ -79,77 +208,108 @@ class NodeManager:
             status = "✅" if length == max_length else "❌"
             print(f"{status} {node}: {length} blocks")
 
-        # Verify block hashes match across nodes
-        reference_chain = next(iter(chains.values()))['chain']
-        for node, data in chains.items():
-            if node == next(iter(chains.keys())):
+        # Compare every node against the longest chain
+        reference = next(node for node, length in lengths.items() if length == max_length)
+        reference_tip = heads[reference]['tip_hash']
+        for node, head in heads.items():
+            if node == reference or head['tip_hash'] == reference_tip:
                 continue
-                
-            chain = data['chain']
-            for i, (ref_block, node_block) in enumerate(zip(reference_chain, chain)):
-                if ref_block['previous_hash'] != node_block['previous_hash']:
-                    print(f"❌ Hash mismatch at block {i} on {node}")
+            try:
+                divergence = self.find_divergence(reference, node, head['length'])
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                print(f"❌ Could not audit {node}: {str(e)}")
+                continue
+            if divergence is None:
+                print(f"ℹ️ {node} is a prefix of {reference}")
+            else:
+                print(f"❌ Hash mismatch at block {divergence} on {node}")
+
+    async def _sweep(self):
+        started = time.perf_counter()
+        results = await self._probe_all(sorted(self.nodes))
+        checked = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for node, head, elapsed in results:
+            if head is None:
+                self.health_data[node] = {
+                    'status': 'offline',
+                    'last_check': checked
+                }
+                continue
+            histogram = self.latency[node]
+            histogram.observe(elapsed)
+            self.health_data[node] = {
+                'status': 'online',
+                'last_check': checked,
+                'chain_length': head['length'],
+                'pending_tx': head.get('pending'),
+                'response_time': elapsed,
+                'p50_response_time': histogram.percentile(50),
+                'p99_response_time': histogram.percentile(99)
+            }
+        self.last_sweep_time = time.perf_counter() - started
+
+    def sweep(self):
+        """Check every known node once, concurrently"""
+        asyncio.run(self._sweep())
 
     def monitor_node_health(self):
         """Monitor node health metrics"""
         self.monitoring = True
         
-        def monitor():
+        async def monitor():
             while self.monitoring:
-                for node in self.nodes:
-                    try:
-                        # Get chain info
-                        chain_response = requests.get(
-                            urljoin(node, "chain"),
-                            timeout=2
-                        )
-                        
-                        # Get pending transactions
-                        tx_response = requests.get(
-                            urljoin(node, "transactions/pending"),
-                            timeout=2
-                        )
-                        
-                        self.health_data[node] = {
-                            'status': 'online',
-                            'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            'chain_length': chain_response.json()['length'],
-                            'pending_tx': len(tx_response.json() if tx_response.status_code == 200 else []),
-                            'response_time': chain_response.elapsed.total_seconds()
-                        }
-                    except requests.exceptions.RequestException:
-                        self.health_data[node] = {
-                            'status': 'offline',
-                            'last_check': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-                
-                time.sleep(10)  # Check every 10 seconds
-
-        self.monitor_thread = threading.Thread(target=monitor)
+                await self._sweep()
+                await asyncio.sleep(self.interval)
+
+        self.monitor_thread = threading.Thread(target=asyncio.run, args=(monitor(),))
         self.monitor_thread.daemon = True
         self.monitor_thread.start()
 
-    def synchronize_chains(self):
-        """Force chain synchronization across all nodes"""
+    def _resolve(self, node):
+        response = peer_client.get(
+            urljoin(node, "nodes/resolve"),
+            params={'brief': 1},
+            timeout=10
+        )
+        response.raise_for_status()
+        return response.json().get('message') == 'Our chain was replaced'
+
+    def synchronize_chains(self, longest_first=True):
+        """Force chain synchronization across all nodes.
+
+        With ``longest_first`` the nodes already holding the longest chain
+        resolve first, so by the time the rest pull, the best chain is settled.
+        """
         print("\nSynchronizing chains...")
-        
-        for node in self.nodes:
-            try:
-                response = requests.get(
-                    urljoin(node, "nodes/resolve"),
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get('message') == 'Our chain was replaced':
-                        print(f"✅ {node} synchronized with network")
-                    else:
-                        print(f"ℹ️ {node} already up to date")
+        started = time.perf_counter()
+
+        waves = [sorted(self.nodes)]
+        if longest_first:
+            lengths = {node: head['length']
+                       for node, head, _ in asyncio.run(self._probe_all(sorted(self.nodes)))
+                       if head is not None}
+            if lengths:
+                max_length = max(lengths.values())
+                leaders = [node for node in waves[0] if lengths.get(node) == max_length]
+                followers = sorted((node for node in waves[0] if node not in leaders),
+                                   key=lambda node: -lengths.get(node, -1))
+                waves = [leaders, followers]
+
+        replaced = current = failed = 0
+        for wave in waves:
+            for node, was_replaced, error in asyncio.run(self._fan_out(wave, self._resolve)):
+                if error is not None:
+                    print(f"❌ Error synchronizing {node}: {str(error)}")
+                    failed += 1
+                elif was_replaced:
+                    print(f"✅ {node} synchronized with network")
+                    replaced += 1
                 else:
-                    print(f"❌ Failed to synchronize {node}")
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Error synchronizing {node}: {str(e)}")
+                    print(f"ℹ️ {node} already up to date")
+                    current += 1
+
+        print(f"\nSynchronized {len(self.nodes)} nodes in {time.perf_counter() - started:.2f}s: "
+              f"{replaced} replaced, {current} up to date, {failed} failed")
 
     def print_health_report(self):
         """Print a health report for all nodes"""
@@ -162,8 +322,47 @@ class NodeManager:
             for key, value in health.items():
                 print(f"{key}: {value}")
 
+        if self.last_sweep_time is not None:
+            print(f"\nLast sweep: {len(self.health_data)} nodes in {self.last_sweep_time:.2f}s")
+
+        print("\nPeer Latency")
+        print("=" * 50)
+        stats = {**peer_client.latency_stats(), **self.probe_client.latency_stats()}
+        for peer, peer_stats in stats.items():
+            if peer_stats['avg_time'] is None and peer not in self.nodes:
+                continue  # Discovery probe that never answered
+            avg = f"{peer_stats['avg_time'] * 1000:.1f} ms" if peer_stats['avg_time'] is not None else "n/a"
+            print(f"{peer}: {peer_stats['requests']} requests, {peer_stats['errors']} errors, avg {avg}")
+
+def parse_ports(spec):
+    """Parse a port list such as "5000-5009,5020" """
+    ports = []
+    for part in spec.split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            ports.extend(range(int(start), int(end) + 1))
+        elif part:
+            ports.append(int(part))
+    return ports
+
 def main():
-    manager = NodeManager()
+    parser = argparse.ArgumentParser(description="Blockchain node manager")
+    parser.add_argument('--hosts', default='localhost', help="Comma-separated hosts to probe")
+    parser.add_argument('--ports', default='5000-5009', help="Port list or ranges, e.g. 5000-5009,5020")
+    parser.add_argument('--nodes', default='', help="Comma-separated node URLs to always include")
+    parser.add_argument('--timeout', type=float, default=2, help="Per-node probe timeout in seconds")
+    parser.add_argument('--interval', type=float, default=10, help="Seconds between health sweeps")
+    parser.add_argument('--workers', type=int, default=16, help="Concurrent connect/sync requests")
+    args = parser.parse_args()
+
+    manager = NodeManager(
+        base_ports=parse_ports(args.ports),
+        hosts=[h for h in args.hosts.split(',') if h],
+        nodes=[n for n in args.nodes.split(',') if n],
+        timeout=args.timeout,
+        interval=args.interval,
+        max_workers=args.workers
+    )
     
     print("Blockchain Node Manager")
     print("======================")
@@ -1,46 +1,48 @@
 import requests
+import peer_client
 import time
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import wire
 
-def connect_nodes(nodes):
-    """Connect multiple blockchain nodes together"""
+def register_with(node, nodes):
+    """Register every other node with ``node``; returns (node, error or None)"""
+    other_nodes = [n for n in nodes if n != node]
+    try:
+        response = peer_client.post(
+            urljoin(node, "nodes/register"),
+            json={"nodes": other_nodes},
+            timeout=5
+        )
+    except Exception as e:
+        return node, str(e)
+    if response.status_code == 201:
+        return node, None
+    return node, f"Status {response.status_code}: {response.text}"
+
+def connect_nodes(nodes, max_workers=8):
+    """Connect multiple blockchain nodes together, registering with up to max_workers at once"""
     print("Starting node connection process...")
+    started = time.perf_counter()
     
     successful_connections = []
     failed_connections = []
     
-    for node in nodes:
-        try:
-            # Register other nodes with this node
-            other_nodes = [n for n in nodes if n != node]
-            payload = {"nodes": other_nodes}
-            
-            print(f"\nRegistering nodes with {node}:")
-            print(f"Payload: {payload}")
-            
-            response = requests.post(
-                urljoin(node, "nodes/register"),
-                json=payload,
-                timeout=5
-            )
-            
-            if response.status_code == 201:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(register_with, node, nodes) for node in nodes]
+        for future in as_completed(futures):
+            node, error = future.result()
+            if error is None:
                 print(f"✅ Successfully registered nodes with {node}")
-                print(f"Response: {response.json()}")
                 successful_connections.append(node)
             else:
                 print(f"❌ Failed to register nodes with {node}")
-                print(f"Status Code: {response.status_code}")
-                print(f"Response: {response.text}")
-                failed_connections.append((node, response.text))
-                
-        except Exception as e:
-            print(f"❌ Error connecting to {node}: {str(e)}")
-            failed_connections.append((node, str(e)))
+                failed_connections.append((node, error))
     
     print("\nConnection Summary:")
     print(f"Successful connections: {len(successful_connections)}")
     print(f"Failed connections: {len(failed_connections)}")
+    print(f"Elapsed: {time.perf_counter() - started:.2f}s")
     
     if failed_connections:
         print("\nFailed Connections Details:")
@@ -55,13 +57,14 @@ def verify_connections(nodes):
     for node in nodes:
         try:
             # Get the chain from each node
-            response = requests.get(
+            response = peer_client.get(
                 urljoin(node, "chain"),
+                headers=wire.ACCEPT_BINARY,
                 timeout=5
             )
             
             if response.status_code == 200:
-                chain_data = response.json()
+                chain_data = wire.decode_response(response)
                 print(f"\n✅ Node {node} is active")
                 print(f"Chain length: {chain_data.get('length', 0)}")
             else:
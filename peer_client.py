@@ -0,0 +1,208 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urljoin, urlparse
+import threading
+import time
+import wire
+
+# GET endpoints that change node state; a 502/503/504 may come from a gateway
+# after the node already acted, so these are never retried on status
+STATE_CHANGING_PATHS = frozenset({'/mine', '/nodes/resolve'})
+
+
+class PeerStats:
+    """Request counters and latency figures for one peer"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.min_time = None
+        self.max_time = 0.0
+        self.last_time = None
+        self.ewma_time = None
+
+    def record(self, elapsed, ok=True):
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+            return
+        self.total_time += elapsed
+        self.last_time = elapsed
+        self.min_time = elapsed if self.min_time is None else min(self.min_time, elapsed)
+        self.max_time = max(self.max_time, elapsed)
+        self.ewma_time = elapsed if self.ewma_time is None else 0.8 * self.ewma_time + 0.2 * elapsed
+
+    def as_dict(self):
+        succeeded = self.requests - self.errors
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_time': self.total_time / succeeded if succeeded else None,
+            'min_time': self.min_time,
+            'max_time': self.max_time,
+            'last_time': self.last_time,
+            'ewma_time': self.ewma_time
+        }
+
+
+class PeerClient:
+    """Pooled HTTP client for node-to-node traffic.
+
+    Keeps pooled ``requests.Session`` objects per peer so connections are
+    reused across calls, retries idempotent requests with exponential backoff,
+    applies a default timeout, and records per-peer latency. Requests to
+    STATE_CHANGING_PATHS only retry failed connects, never error statuses.
+    """
+
+    def __init__(self, timeout=5, retries=3, backoff_factor=0.2, pool_maxsize=10):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def peer_of(url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def session(self, peer, retry_status=True):
+        """Return the pooled session for ``peer`` (scheme://host:port).
+
+        With ``retry_status=False`` the session retries only connection
+        failures, for GETs that must not run twice.
+        """
+        with self._lock:
+            session = self._sessions.get((peer, retry_status))
+            if session is None:
+                # Reads are not retried: the peer may already have handled the request
+                retry = Retry(
+                    total=self.retries,
+                    read=0,
+                    other=0,
+                    status=None if retry_status else 0,
+                    backoff_factor=self.backoff_factor,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset({'GET', 'HEAD'}),
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_maxsize=self.pool_maxsize, max_retries=retry)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[(peer, retry_status)] = session
+                self._stats.setdefault(peer, PeerStats())
+            return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        peer = self.peer_of(url)
+        path = urlparse(url).path.rstrip('/')
+        state_changing = any(path.endswith(p) for p in STATE_CHANGING_PATHS)
+        session = self.session(peer, retry_status=not state_changing)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._stats[peer].record(time.perf_counter() - started, ok=False)
+            raise
+        with self._lock:
+            self._stats[peer].record(time.perf_counter() - started, ok=response.status_code < 500)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def latency_stats(self):
+        """Return a snapshot of per-peer request and latency figures"""
+        with self._lock:
+            return {peer: stats.as_dict() for peer, stats in self._stats.items()}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+# Process-wide client shared by every inter-node caller
+default_client = PeerClient()
+
+
+def get(url, **kwargs):
+    return default_client.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return default_client.post(url, **kwargs)
+
+
+def latency_stats():
+    return default_client.latency_stats()
+
+
+def transferred_bytes(response):
+    """Size of ``response``'s body as sent on the wire, before gzip/zstd decoding"""
+    response.content  # Read the whole body so the raw byte count is final
+    raw = getattr(response, 'raw', None)
+    if hasattr(raw, 'tell'):
+        return raw.tell()
+    length = response.headers.get('Content-Length', '')
+    return int(length) if length.isdigit() else len(response.content)
+
+
+def post_transactions(node_url, transactions, batch_size=1000, timeout=60):
+    """Submit signed transactions to /transactions/batch, ``batch_size`` per request.
+
+    Returns one result dict per transaction, in order (``status`` 201 when accepted).
+    """
+    results = []
+    for start in range(0, len(transactions), batch_size):
+        response = default_client.post(f"{node_url}/transactions/batch",
+                                       json={'transactions': transactions[start:start + batch_size]},
+                                       timeout=timeout)
+        response.raise_for_status()
+        results.extend(response.json()['results'])
+    return results
+
+
+class ChainCache:
+    """Remembers the last /chain response per node and revalidates it with If-None-Match.
+
+    An unchanged chain costs one 304 with no body instead of a full download
+    and decode, which keeps idle polling from the consoles and NodeManager cheap.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or default_client
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_chain(self, node_url, timeout=None):
+        """Return the decoded /chain payload for ``node_url``"""
+        url = urljoin(node_url, "chain")
+        headers = dict(wire.ACCEPT_BINARY)
+        with self._lock:
+            cached = self._entries.get(url)
+        if cached:
+            headers['If-None-Match'] = cached[0]
+
+        response = self.client.get(url, headers=headers, timeout=timeout or self.client.timeout)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        response.raise_for_status()
+
+        data = wire.decode_response(response)
+        etag = response.headers.get('ETag')
+        if etag:
+            with self._lock:
+                self._entries[url] = (etag, data)
+        return data
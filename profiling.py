@@ -0,0 +1,260 @@
+"""Opt-in request profiling for the Flask apps.
+
+With BLOCKCHAIN_PROFILE=1, ``install(app, blockchain)`` times each request
+and reports where the time went in a ``Server-Timing`` header: chain store
+calls (``store``), the SQL statements they run (``db``), signature work
+(``crypto``), proof of work (``pow``) and body encoding (``serialize``). It also adds ``/debug/profile``, which runs
+cProfile over every request in a window, or samples all thread stacks, and
+returns the stats as text.
+
+Code marks spans with ``with profiling.span('crypto'):``. Outside a profiled
+request that is a shared no-op context manager.
+"""
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+ENABLED = os.environ.get('BLOCKCHAIN_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+MAX_WINDOW = 60
+
+# What a span's count counts in the Server-Timing description
+SPAN_UNITS = {'db': 'statements'}
+
+_local = threading.local()
+_NULL = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ('name', 'trace', 'started')
+
+    def __init__(self, name, trace):
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _add(self.trace, self.name, time.perf_counter() - self.started)
+        return False
+
+
+def _add(trace, name, elapsed):
+    """Count one event under ``name``; an ``elapsed`` of None counts it without timing it"""
+    totals = trace.get(name)
+    if totals is None:
+        trace[name] = [elapsed, 1]
+    else:
+        if elapsed is not None:
+            totals[0] = elapsed if totals[0] is None else totals[0] + elapsed
+        totals[1] += 1
+
+
+def span(name):
+    """Time a block under ``name`` if the current thread is serving a profiled request"""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return _NULL
+    return _Span(name, trace)
+
+
+def record(name, elapsed):
+    """Add one already-timed event to the current thread's profiled request, if any"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        _add(trace, name, elapsed)
+
+
+def _record_sql(statement, elapsed):
+    # SQLite statements are counted only; their time shows up in the store span
+    record('db', elapsed)
+
+
+class TimedStore:
+    """Chain store proxy that records every store call as a ``store`` span"""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getattr__(self, name):
+        attr = getattr(self._store, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            with span('store'):
+                return attr(*args, **kwargs)
+        return timed
+
+
+def server_timing(trace, total):
+    """Format recorded spans as a Server-Timing header value"""
+    entries = []
+    for name, (elapsed, count) in sorted(trace.items()):
+        dur = '' if elapsed is None else f';dur={elapsed * 1000:.2f}'
+        entries.append(f'{name}{dur};desc="{count} {SPAN_UNITS.get(name, "calls")}"')
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class ProfileWindow:
+    """Aggregates cProfile stats from every request that starts inside the window"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deadline = 0
+        self.stats = None
+        self.skipped = 0
+
+    def open(self, seconds):
+        with self.lock:
+            if self.active():
+                raise ValueError("A profiling window is already running")
+            self.deadline = time.monotonic() + seconds
+            self.stats = None
+            self.skipped = 0
+
+    def active(self):
+        return time.monotonic() < self.deadline
+
+    def start(self):
+        if not self.active():
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile at a time across threads
+            with self.lock:
+                self.skipped += 1
+            return None
+        return profile
+
+    def finish(self, profile):
+        profile.disable()
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def report(self, sort, limit):
+        out = io.StringIO()
+        with self.lock:
+            if self.stats is None:
+                out.write("No requests were profiled in the window\n")
+            else:
+                self.stats.stream = out
+                self.stats.sort_stats(sort).print_stats(limit)
+            if self.skipped:
+                out.write(f"\n{self.skipped} concurrent requests were not profiled\n")
+        return out.getvalue()
+
+
+def sample_stacks(seconds, interval=0.005, limit=30):
+    """Sample every thread's stack for ``seconds`` and return the hottest stacks and functions"""
+    me = threading.get_ident()
+    stacks = Counter()
+    functions = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+                frame = frame.f_back
+            if frames:
+                functions[frames[0].rsplit(':', 1)[0]] += 1
+                stacks[';'.join(reversed(frames))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    lines = [f"{samples} samples over {seconds}s every {interval * 1000:.0f}ms", "", "Top functions (self):"]
+    lines += [f"{count:8d}  {name}" for name, count in functions.most_common(limit)]
+    lines += ["", "Top stacks (collapsed, root first):"]
+    lines += [f"{stack} {count}" for stack, count in stacks.most_common(limit)]
+    return '\n'.join(lines) + '\n'
+
+
+def install(app, blockchain):
+    """Enable request timing and the /debug/profile endpoint when BLOCKCHAIN_PROFILE is set"""
+    if not ENABLED:
+        return False
+    from flask import g, request, Response, jsonify
+
+    blockchain.store.trace_sql(_record_sql)
+    blockchain.store = TimedStore(blockchain.store)
+    window = ProfileWindow()
+
+    # jsonify() and request.get_json() go through the app's JSON provider
+    dumps, loads = app.json.dumps, app.json.loads
+
+    def timed_dumps(obj, **kwargs):
+        with span('serialize'):
+            return dumps(obj, **kwargs)
+
+    def timed_loads(data, **kwargs):
+        with span('serialize'):
+            return loads(data, **kwargs)
+
+    app.json.dumps = timed_dumps
+    app.json.loads = timed_loads
+
+    @app.before_request
+    def start_trace():
+        _local.trace = {}
+        g.profile_started = time.perf_counter()
+        g.profile = window.start() if request.endpoint != 'debug_profile' else None
+
+    @app.after_request
+    def add_server_timing(response):
+        trace = getattr(_local, 'trace', None)
+        started = g.get('profile_started')
+        if trace is not None and started is not None:
+            response.headers['Server-Timing'] = server_timing(trace, time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def end_trace(exc):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            window.finish(profile)
+        _local.trace = None
+
+    @app.route('/debug/profile', methods=['GET'])
+    def debug_profile():
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            limit = int(request.args.get('limit', 40))
+        except ValueError:
+            return jsonify({'error': 'seconds and limit must be numbers'}), 400
+        if not 0 < seconds <= MAX_WINDOW:
+            return jsonify({'error': f'seconds must be between 0 and {MAX_WINDOW}'}), 400
+
+        mode = request.args.get('mode', 'cprofile')
+        if mode == 'sample':
+            return Response(sample_stacks(seconds, limit=limit), mimetype='text/plain')
+        if mode != 'cprofile':
+            return jsonify({'error': "mode must be 'cprofile' or 'sample'"}), 400
+
+        try:
+            window.open(seconds)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 409
+        time.sleep(seconds)
+        return Response(window.report(request.args.get('sort', 'cumulative'), limit),
+                        mimetype='text/plain')
+
+    return True
@@ -0,0 +1,96 @@
+"""Serve the node or the web interface with a production WSGI server.
+
+    python serve.py node --port 5000 --workers 4 --threads 8
+    python serve.py web --port 5001 --threads 8
+
+Uses gunicorn when it is installed (one process per worker, each with its
+own database connections, all sharing the chain store, mempool and tip
+through the database). Falls back to waitress, which is a single
+multi-threaded process. ``python node.py`` remains the development server.
+
+The web interface keeps the current wallet in process memory, so it always
+runs as a single process; scale it with ``--threads``.
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+APPS = {'node': 'node', 'web': 'web_interface'}
+
+
+def load_app(target):
+    return importlib.import_module(APPS[target]).app
+
+
+if BaseApplication is not None:
+    class GunicornServer(BaseApplication):
+        def __init__(self, target, options):
+            self.target = target
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Runs in each worker after fork, so every worker opens its own store
+            return load_app(self.target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a blockchain app under a production WSGI server')
+    parser.add_argument('app', choices=sorted(APPS), help='node (node.py) or web (web_interface.py)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (gunicorn only; default: CPU count for node, 1 for web)')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker')
+    parser.add_argument('--timeout', type=int, default=120,
+                        help='Seconds before a silent worker is restarted (mining can be slow)')
+    args = parser.parse_args()
+    if args.workers is None:
+        args.workers = 1 if args.app == 'web' else multiprocessing.cpu_count()
+    if args.app == 'web' and args.workers > 1:
+        parser.error('the web interface keeps its wallet in process memory; use --workers 1 (and --threads to scale)')
+
+    # node.py derives its gossip origin URL from PORT
+    os.environ['PORT'] = str(args.port)
+
+    if BaseApplication is not None:
+        if args.workers > 1 and os.environ.get('BLOCKCHAIN_ARCHIVE_DIR'):
+            parser.error('BLOCKCHAIN_ARCHIVE_DIR is single-writer; use --workers 1 with the block archive')
+        print(f"Serving {args.app} on {args.host}:{args.port} with gunicorn "
+              f"({args.workers} workers x {args.threads} threads)")
+        GunicornServer(args.app, {
+            'bind': f'{args.host}:{args.port}',
+            'workers': args.workers,
+            'threads': args.threads,
+            'worker_class': 'gthread',
+            'timeout': args.timeout,
+            'preload_app': False
+        }).run()
+    elif waitress is not None:
+        if args.workers > 1:
+            print("gunicorn is not installed; waitress runs a single process")
+        print(f"Serving {args.app} on {args.host}:{args.port} with waitress ({args.threads} threads)")
+        waitress.serve(load_app(args.app), host=args.host, port=args.port, threads=args.threads)
+    else:
+        print("Install gunicorn (pip install gunicorn) or waitress (pip install waitress) to use serve.py")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
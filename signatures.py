@@ -0,0 +1,160 @@
+"""Pluggable signature schemes for wallets and transaction verification.
+
+Two schemes are registered:
+
+- ``rsa-pss``: RSA-2048 with PSS/SHA-256. This is the original scheme, and
+  its addresses are the first 32 hex chars of sha256(public key PEM).
+- ``ed25519``: 64-byte signatures and much faster verification. Its
+  addresses are the same hash with an ``ed`` prefix.
+
+A transaction may name its scheme in a ``scheme`` field. If it does not,
+the scheme is taken from the public key. Either way it must agree with the
+key type and the sender address prefix.
+"""
+import hashlib
+import json
+from functools import lru_cache
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+DEFAULT_SCHEME = 'rsa-pss'
+
+# Version of the signed message new wallets produce (see signing_message)
+TRANSACTION_VERSION = 2
+
+
+class SignatureScheme:
+    name = None
+    address_prefix = ''
+    key_types = ()
+
+    def generate(self):
+        raise NotImplementedError
+
+    def sign(self, private_key, message):
+        raise NotImplementedError
+
+    def verify(self, public_key, signature, message):
+        """True if ``signature`` over ``message`` is valid for ``public_key``"""
+        raise NotImplementedError
+
+    def address(self, public_key):
+        return self.address_prefix + hashlib.sha256(public_key_pem(public_key).encode()).hexdigest()[:32]
+
+
+class RSAPSSScheme(SignatureScheme):
+    name = 'rsa-pss'
+    key_types = (rsa.RSAPrivateKey, rsa.RSAPublicKey)
+
+    PADDING = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+    def generate(self):
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def sign(self, private_key, message):
+        return private_key.sign(message, self.PADDING, hashes.SHA256())
+
+    def verify(self, public_key, signature, message):
+        try:
+            public_key.verify(signature, message, self.PADDING, hashes.SHA256())
+            return True
+        except InvalidSignature:
+            return False
+
+
+class Ed25519Scheme(SignatureScheme):
+    name = 'ed25519'
+    address_prefix = 'ed'
+    key_types = (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)
+
+    def generate(self):
+        return ed25519.Ed25519PrivateKey.generate()
+
+    def sign(self, private_key, message):
+        return private_key.sign(message)
+
+    def verify(self, public_key, signature, message):
+        try:
+            public_key.verify(signature, message)
+            return True
+        except InvalidSignature:
+            return False
+
+
+SCHEMES = {scheme.name: scheme for scheme in (RSAPSSScheme(), Ed25519Scheme())}
+
+
+def get_scheme(name=None):
+    """Look up a scheme by name; None means the default"""
+    try:
+        return SCHEMES[name or DEFAULT_SCHEME]
+    except KeyError:
+        raise ValueError(f"Unknown signature scheme: {name}")
+
+
+def scheme_for_key(key):
+    """The scheme that a private or public key object belongs to"""
+    for scheme in SCHEMES.values():
+        if isinstance(key, scheme.key_types):
+            return scheme
+    raise ValueError(f"Unsupported key type: {type(key).__name__}")
+
+
+def public_key_pem(public_key):
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+
+@lru_cache(maxsize=4096)
+def load_public_key(pem):
+    """Parse a PEM public key into (key, scheme, address).
+
+    Cached because senders reuse their key across transactions.
+    """
+    public_key = serialization.load_pem_public_key(pem.encode())
+    scheme = scheme_for_key(public_key)
+    return public_key, scheme, scheme.address(public_key)
+
+
+def signing_message(transaction):
+    """The bytes a wallet signs for ``transaction``.
+
+    Version 1 (the original format, used when ``version`` is absent) covers
+    sender, recipient and amount only. Version 2 also covers the timestamp and
+    scheme, so a transfer can't be replayed under a new timestamp.
+    """
+    version = int(transaction.get('version') or 1)
+    if version not in (1, 2):
+        raise ValueError(f"Unsupported transaction version: {version}")
+    fields = {
+        'sender': transaction['sender'],
+        'recipient': transaction['recipient'],
+        'amount': float(transaction['amount'])
+    }
+    if version >= 2:
+        if transaction.get('timestamp') is None or not transaction.get('scheme'):
+            raise ValueError("Version 2 transactions must include timestamp and scheme")
+        fields.update(version=version, timestamp=float(transaction['timestamp']),
+                      scheme=transaction['scheme'])
+    return json.dumps(fields, sort_keys=True).encode('utf-8')
+
+
+def verify_transaction(transaction, signature, pem):
+    """Check the signature and that the key, declared scheme and sender address agree.
+
+    ``signature`` is raw bytes. Raises ValueError for a malformed key or a
+    scheme mismatch, and returns False for a bad signature.
+    """
+    try:
+        public_key, scheme, address = load_public_key(pem)
+    except Exception as e:
+        raise ValueError(f"Invalid public key: {str(e)}")
+    declared = transaction.get('scheme')
+    if declared and get_scheme(declared) is not scheme:
+        raise ValueError(f"Transaction declares {declared} but the key is {scheme.name}")
+    if address != transaction['sender']:
+        raise ValueError("Sender address does not match public key")
+    return scheme.verify(public_key, signature, signing_message(dict(transaction, scheme=scheme.name)))
@@ -0,0 +1,689 @@
+import os
+import sqlite3
+import threading
+import time
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from models import Block, Transaction, PendingTransaction, ChainState, Node, init_db
+from units import to_units, from_units
+
+
+class StaleBlockError(ValueError):
+    """Another writer already appended a block at this height"""
+
+
+class DuplicateTransactionError(ValueError):
+    """The transaction id is already in the mempool"""
+
+
+PENDING_FIELDS = ('txid', 'sender', 'recipient', 'amount', 'timestamp', 'signature', 'public_key', 'version')
+
+
+def match_txids(blocks, confirmed):
+    """Per block, the txid of each transaction matched to a ``confirmed`` mempool
+    entry by (sender, recipient, amount), or None.
+
+    Blocks carry no signatures, so this is the only link between a block's
+    transactions and the txids they were admitted under.
+    """
+    unmatched = {}
+    for tx in confirmed:
+        unmatched.setdefault((tx['sender'], tx['recipient'], to_units(tx['amount'])), []).append(tx['txid'])
+    matched = []
+    for block in blocks:
+        txids = []
+        for tx in block['transactions']:
+            queue = unmatched.get((tx['sender'], tx['recipient'], to_units(tx['amount'])))
+            txids.append(queue.pop(0) if queue else None)
+        matched.append(txids)
+    return matched
+
+
+def _is_txid_conflict(error):
+    """True if an IntegrityError comes from the confirmed txid unique index"""
+    return 'txid' in str(getattr(error, 'orig', error))
+
+
+class ChainStore:
+    """Storage interface used by the Blockchain for blocks, transactions and nodes.
+
+    Blocks are exchanged as plain dicts in the same shape that ``/chain``
+    returns, so hashing and validation never depend on the backend. The
+    mempool and chain tip live here too, so several worker processes can
+    share one store.
+    """
+
+    def get_last_block(self):
+        """Return the tip block, or None for an empty chain"""
+        raise NotImplementedError
+
+    def get_block(self, index):
+        """Return the block at ``index`` (1-based), or None"""
+        raise NotImplementedError
+
+    def get_chain(self):
+        """Return every block in index order"""
+        raise NotImplementedError
+
+    def chain_length(self):
+        """Return the number of blocks in the chain"""
+        raise NotImplementedError
+
+    def append_block(self, block, confirmed=()):
+        """Persist a new tip block and return it as it will be read back.
+
+        ``confirmed`` are the mempool transactions the block includes: they
+        leave the mempool and their txids are recorded on the block's rows.
+        Raises StaleBlockError if a block already exists at that height, or
+        DuplicateTransactionError if one of the txids is already confirmed.
+        """
+        raise NotImplementedError
+
+    def replace_chain(self, chain, confirmed=(), fork=0):
+        """Replace the blocks after height ``fork`` with ``chain[fork:]``, handling
+        ``confirmed`` mempool transactions as append_block does, in one transaction"""
+        raise NotImplementedError
+
+    def add_transaction(self, transaction):
+        """Add an admitted transaction to the mempool; raises DuplicateTransactionError"""
+        raise NotImplementedError
+
+    def get_pending(self):
+        """Return mempool transactions in admission order"""
+        raise NotImplementedError
+
+    def get_pending_transaction(self, txid):
+        """Return the mempool transaction with ``txid``, or None"""
+        raise NotImplementedError
+
+    def confirmed_txids(self, txids):
+        """The subset of ``txids`` already recorded in a block"""
+        raise NotImplementedError
+
+    def remove_pending(self, txids):
+        """Drop ``txids`` from the mempool"""
+        raise NotImplementedError
+
+    def pending_count(self):
+        return len(self.get_pending())
+
+    def chain_epoch(self):
+        """Counter bumped by every replace_chain, for invalidating derived caches"""
+        raise NotImplementedError
+
+    def get_balance(self, address):
+        """Sum confirmed credits minus debits for ``address``"""
+        raise NotImplementedError
+
+    def get_pending_spend(self, address):
+        """Sum of the mempool transactions sent by ``address``"""
+        raise NotImplementedError
+
+    def register_node(self, address):
+        """Remember a peer node address"""
+        raise NotImplementedError
+
+    def get_nodes(self):
+        """Return the list of known peer node addresses"""
+        raise NotImplementedError
+
+    def pool_status(self):
+        """Connection pool usage as a dict, or None if the backend has no pool"""
+        return None
+
+    def trace_sql(self, listener):
+        """Call ``listener(statement, elapsed)`` for every SQL statement the store runs.
+
+        ``elapsed`` is None if the backend cannot time single statements.
+        Returns False if the backend cannot report statements at all.
+        """
+        return False
+
+    def release(self):
+        """Return per-request resources (sessions) at the end of a request"""
+        pass
+
+    def close(self):
+        pass
+
+
+class PostgresChainStore(ChainStore):
+    """SQLAlchemy-backed store using the models in models.py.
+
+    ``self.db`` is a scoped_session, so every thread works in its own
+    session; call ``release()`` when a request finishes.
+    """
+
+    def __init__(self, db_url=None):
+        self.db = init_db(db_url, scoped=True)
+
+    @staticmethod
+    def _block_to_dict(block):
+        return {
+            'index': block.index,
+            'timestamp': block.timestamp,
+            'proof': block.proof,
+            'previous_hash': block.previous_hash,
+            'transactions': [
+                {
+                    'sender': tx.sender,
+                    'recipient': tx.recipient,
+                    'amount': from_units(tx.amount)
+                } for tx in sorted(block.transactions, key=lambda t: t.id)
+            ]
+        }
+
+    def get_last_block(self):
+        block = self.db.query(Block).order_by(Block.index.desc()).first()
+        return self._block_to_dict(block) if block else None
+
+    def get_block(self, index):
+        block = self.db.query(Block).filter_by(index=index).first()
+        return self._block_to_dict(block) if block else None
+
+    def get_chain(self):
+        blocks = (
+            self.db.query(Block)
+            .options(selectinload(Block.transactions))
+            .order_by(Block.index)
+            .all()
+        )
+        return [self._block_to_dict(block) for block in blocks]
+
+    def chain_length(self):
+        return self.db.query(Block).count()
+
+    def _add_block(self, block_data, txids=None):
+        block = Block(
+            index=block_data['index'],
+            timestamp=float(block_data['timestamp']),
+            proof=block_data['proof'],
+            previous_hash=block_data['previous_hash']
+        )
+        self.db.add(block)
+        for position, tx_data in enumerate(block_data['transactions']):
+            self.db.add(Transaction(
+                sender=tx_data['sender'],
+                recipient=tx_data['recipient'],
+                amount=to_units(tx_data['amount']),
+                txid=txids[position] if txids else None,
+                block=block
+            ))
+        return block
+
+    def _delete_pending(self, txids):
+        if txids:
+            self.db.query(PendingTransaction).filter(
+                PendingTransaction.txid.in_(list(txids))).delete(synchronize_session=False)
+
+    def append_block(self, block, confirmed=()):
+        try:
+            row = self._add_block(block, match_txids([block], confirmed)[0])
+            self._delete_pending([tx['txid'] for tx in confirmed])
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            if _is_txid_conflict(e):
+                raise DuplicateTransactionError("Transaction already confirmed")
+            raise StaleBlockError(f"Block {block['index']} already exists")
+        except Exception:
+            self.db.rollback()
+            raise
+        return self._block_to_dict(row)
+
+    def replace_chain(self, chain, confirmed=(), fork=0):
+        try:
+            orphaned = self.db.query(Block.id).filter(Block.index > fork)
+            self.db.query(Transaction).filter(Transaction.block_id.in_(orphaned.scalar_subquery())).delete(
+                synchronize_session=False)
+            self.db.query(Block).filter(Block.index > fork).delete(synchronize_session=False)
+            added = chain[fork:]
+            for block_data, txids in zip(added, match_txids(added, confirmed)):
+                self._add_block(block_data, txids)
+            self._delete_pending([tx['txid'] for tx in confirmed])
+            state = self.db.get(ChainState, 1)
+            if state is None:
+                self.db.add(ChainState(id=1, epoch=1))
+            else:
+                state.epoch = ChainState.epoch + 1
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def add_transaction(self, transaction):
+        try:
+            fields = {key: transaction.get(key) for key in PENDING_FIELDS}
+            fields['amount'] = to_units(fields['amount'])
+            fields['version'] = fields['version'] or 1
+            self.db.add(PendingTransaction(**fields))
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise DuplicateTransactionError("Duplicate transaction")
+        except Exception:
+            self.db.rollback()
+            raise
+
+    @staticmethod
+    def _pending_to_dict(row):
+        pending = {key: getattr(row, key) for key in PENDING_FIELDS}
+        pending['amount'] = from_units(row.amount)
+        return pending
+
+    def get_pending(self):
+        rows = self.db.query(PendingTransaction).order_by(PendingTransaction.id).all()
+        return [self._pending_to_dict(row) for row in rows]
+
+    def get_pending_transaction(self, txid):
+        row = self.db.query(PendingTransaction).filter_by(txid=txid).first()
+        return self._pending_to_dict(row) if row else None
+
+    def confirmed_txids(self, txids):
+        txids = list(txids)
+        if not txids:
+            return set()
+        return {row[0] for row in self.db.query(Transaction.txid).filter(Transaction.txid.in_(txids))}
+
+    def remove_pending(self, txids):
+        try:
+            self._delete_pending(txids)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def pending_count(self):
+        return self.db.query(PendingTransaction).count()
+
+    def chain_epoch(self):
+        state = self.db.get(ChainState, 1)
+        return state.epoch if state else 0
+
+    def get_balance(self, address):
+        confirmed = Transaction.block_id.isnot(None)
+        received = self.db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
+            confirmed, Transaction.recipient == address).scalar()
+        sent = self.db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
+            confirmed, Transaction.sender == address).scalar()
+        return from_units(int(received) - int(sent))
+
+    def get_pending_spend(self, address):
+        spent = self.db.query(func.coalesce(func.sum(PendingTransaction.amount), 0)).filter(
+            PendingTransaction.sender == address).scalar()
+        return from_units(int(spent))
+
+    def register_node(self, address):
+        try:
+            if not self.db.query(Node).filter_by(address=address).first():
+                self.db.add(Node(address=address))
+                self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def get_nodes(self):
+        return [node.address for node in self.db.query(Node).all()]
+
+    def pool_status(self):
+        pool = self.db.get_bind().pool
+        if not hasattr(pool, 'checkedout'):
+            return None
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow()
+        }
+
+    def trace_sql(self, listener):
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('trace_started', []).append(time.perf_counter())
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            listener(statement, time.perf_counter() - conn.info['trace_started'].pop())
+
+        engine = self.db.get_bind()
+        event.listen(engine, 'before_cursor_execute', before)
+        event.listen(engine, 'after_cursor_execute', after)
+        return True
+
+    def release(self):
+        self.db.remove()
+
+    def close(self):
+        self.db.remove()
+
+
+class SQLiteChainStore(ChainStore):
+    """Embedded single-file store for edge nodes and local runs.
+
+    Uses the stdlib sqlite3 module in WAL mode so readers never block the
+    writer, and keeps the tip block in memory so tip reads skip the database.
+    Several processes may open the same file: writes take the database lock
+    with BEGIN IMMEDIATE, and the cached tip is reloaded whenever
+    ``PRAGMA data_version`` shows another connection has committed.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blocks (
+            idx INTEGER PRIMARY KEY,
+            timestamp REAL NOT NULL,
+            proof INTEGER NOT NULL,
+            previous_hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            block_idx INTEGER REFERENCES blocks(idx),
+            sender TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            txid TEXT
+        );
+        CREATE INDEX IF NOT EXISTS ix_transactions_block ON transactions(block_idx);
+        CREATE INDEX IF NOT EXISTS ix_transactions_sender ON transactions(sender);
+        CREATE INDEX IF NOT EXISTS ix_transactions_recipient ON transactions(recipient);
+        CREATE TABLE IF NOT EXISTS nodes (
+            address TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS mempool (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            txid TEXT NOT NULL UNIQUE,
+            sender TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            timestamp REAL NOT NULL,
+            signature TEXT,
+            public_key TEXT,
+            version INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE IF NOT EXISTS chain_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            epoch INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO chain_state (id, epoch) VALUES (1, 0);
+    """
+
+    def __init__(self, path="blockchain.db"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self._upgrade_amounts()
+        self._tip = None
+        self._data_version = None
+        self._refresh_tip()
+
+    def _upgrade_amounts(self):
+        """Convert REAL coin amounts from older files to INTEGER base units"""
+        for table, columns in (('transactions', 'id, block_idx, sender, recipient, amount'),
+                               ('mempool', 'seq, txid, sender, recipient, amount, timestamp, signature, public_key')):
+            types = {row[1]: row[2] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if types.get('amount', '').upper() != 'REAL':
+                continue
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                create = self.conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()[0]
+                self.conn.execute(f"ALTER TABLE {table} RENAME TO {table}_real")
+                self.conn.execute(create.replace('amount REAL', 'amount INTEGER'))
+                self.conn.execute(
+                    f"INSERT INTO {table} ({columns}) SELECT "
+                    + columns.replace('amount', 'CAST(ROUND(amount * 100000000) AS INTEGER)')
+                    + f" FROM {table}_real"
+                )
+                self.conn.execute(f"DROP TABLE {table}_real")
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        # Recreate indexes dropped with the old tables
+        self.conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(mempool)")}
+        if 'version' not in columns:
+            self.conn.execute("ALTER TABLE mempool ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(transactions)")}
+        if 'txid' not in columns:
+            self.conn.execute("ALTER TABLE transactions ADD COLUMN txid TEXT")
+        # Confirmed txids are unique; rows from peers' blocks we never saw pending have none
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_transactions_txid ON transactions(txid)")
+
+    def _refresh_tip(self):
+        """Reload the cached tip if another connection committed since we last looked"""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._load_tip()
+
+    def _load_tip(self):
+        row = self.conn.execute(
+            "SELECT idx, timestamp, proof, previous_hash FROM blocks ORDER BY idx DESC LIMIT 1"
+        ).fetchone()
+        self._tip = self._read_blocks([row])[0] if row else None
+
+    def _read_blocks(self, rows):
+        if not rows:
+            return []
+        blocks = {}
+        for idx, timestamp, proof, previous_hash in rows:
+            blocks[idx] = {
+                'index': idx,
+                'timestamp': timestamp,
+                'proof': proof,
+                'previous_hash': previous_hash,
+                'transactions': []
+            }
+        lo, hi = min(blocks), max(blocks)
+        tx_rows = self.conn.execute(
+            "SELECT block_idx, sender, recipient, amount FROM transactions "
+            "WHERE block_idx BETWEEN ? AND ? ORDER BY id",
+            (lo, hi)
+        )
+        for block_idx, sender, recipient, amount in tx_rows:
+            if block_idx in blocks:
+                blocks[block_idx]['transactions'].append({
+                    'sender': sender,
+                    'recipient': recipient,
+                    'amount': from_units(amount)
+                })
+        return [blocks[idx] for idx, *_ in rows]
+
+    def _insert_block(self, block, txids=None):
+        self.conn.execute(
+            "INSERT INTO blocks (idx, timestamp, proof, previous_hash) VALUES (?, ?, ?, ?)",
+            (block['index'], block['timestamp'], block['proof'], block['previous_hash'])
+        )
+        txids = txids or [None] * len(block['transactions'])
+        self.conn.executemany(
+            "INSERT INTO transactions (block_idx, sender, recipient, amount, txid) VALUES (?, ?, ?, ?, ?)",
+            [(block['index'], tx['sender'], tx['recipient'], to_units(tx['amount']), txid)
+             for tx, txid in zip(block['transactions'], txids)]
+        )
+
+    def get_last_block(self):
+        with self.lock:
+            self._refresh_tip()
+            return self._tip
+
+    def get_block(self, index):
+        with self.lock:
+            self._refresh_tip()
+            if self._tip and index == self._tip['index']:
+                return self._tip
+            row = self.conn.execute(
+                "SELECT idx, timestamp, proof, previous_hash FROM blocks WHERE idx = ?",
+                (index,)
+            ).fetchone()
+            return self._read_blocks([row])[0] if row else None
+
+    def get_chain(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT idx, timestamp, proof, previous_hash FROM blocks ORDER BY idx"
+            ).fetchall()
+            return self._read_blocks(rows)
+
+    def chain_length(self):
+        tip = self.get_last_block()
+        return tip['index'] if tip else 0
+
+    def append_block(self, block, confirmed=()):
+        block = {
+            'index': block['index'],
+            'timestamp': float(block['timestamp']),
+            'proof': block['proof'],
+            'previous_hash': block['previous_hash'],
+            'transactions': [
+                {
+                    'sender': tx['sender'],
+                    'recipient': tx['recipient'],
+                    'amount': float(tx['amount'])
+                } for tx in block['transactions']
+            ]
+        }
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._insert_block(block, match_txids([block], confirmed)[0])
+                self.conn.executemany("DELETE FROM mempool WHERE txid = ?",
+                                      [(tx['txid'],) for tx in confirmed])
+                self.conn.execute("COMMIT")
+            except sqlite3.IntegrityError as e:
+                self.conn.execute("ROLLBACK")
+                if _is_txid_conflict(e):
+                    raise DuplicateTransactionError("Transaction already confirmed")
+                raise StaleBlockError(f"Block {block['index']} already exists")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self._tip = block
+        return block
+
+    def replace_chain(self, chain, confirmed=(), fork=0):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("DELETE FROM transactions WHERE block_idx > ?", (fork,))
+                self.conn.execute("DELETE FROM blocks WHERE idx > ?", (fork,))
+                added = chain[fork:]
+                for block, txids in zip(added, match_txids(added, confirmed)):
+                    self._insert_block(block, txids)
+                self.conn.executemany("DELETE FROM mempool WHERE txid = ?", [(tx['txid'],) for tx in confirmed])
+                self.conn.execute("UPDATE chain_state SET epoch = epoch + 1 WHERE id = 1")
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self._load_tip()
+
+    def add_transaction(self, transaction):
+        with self.lock:
+            try:
+                self.conn.execute(
+                    "INSERT INTO mempool (txid, sender, recipient, amount, timestamp, signature, public_key, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (transaction['txid'], transaction['sender'], transaction['recipient'],
+                     to_units(transaction['amount']), transaction['timestamp'],
+                     transaction.get('signature'), transaction.get('public_key'),
+                     transaction.get('version') or 1)
+                )
+            except sqlite3.IntegrityError:
+                raise DuplicateTransactionError("Duplicate transaction")
+
+    def _read_pending(self, where='', params=()):
+        rows = self.conn.execute(
+            "SELECT txid, sender, recipient, amount, timestamp, signature, public_key, version "
+            f"FROM mempool {where} ORDER BY seq", params
+        )
+        pending = [dict(zip(PENDING_FIELDS, row)) for row in rows]
+        for tx in pending:
+            tx['amount'] = from_units(tx['amount'])
+        return pending
+
+    def get_pending(self):
+        with self.lock:
+            return self._read_pending()
+
+    def get_pending_transaction(self, txid):
+        with self.lock:
+            rows = self._read_pending("WHERE txid = ?", (txid,))
+        return rows[0] if rows else None
+
+    def confirmed_txids(self, txids):
+        txids = list(txids)
+        found = set()
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(txids), 500):
+                chunk = txids[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT txid FROM transactions WHERE txid IN ({','.join('?' * len(chunk))})", chunk)
+                found.update(row[0] for row in rows)
+        return found
+
+    def remove_pending(self, txids):
+        with self.lock:
+            self.conn.executemany("DELETE FROM mempool WHERE txid = ?", [(txid,) for txid in txids])
+
+    def pending_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM mempool").fetchone()[0]
+
+    def chain_epoch(self):
+        with self.lock:
+            return self.conn.execute("SELECT epoch FROM chain_state WHERE id = 1").fetchone()[0]
+
+    def get_balance(self, address):
+        with self.lock:
+            received, sent = self.conn.execute(
+                "SELECT "
+                "(SELECT COALESCE(SUM(amount), 0) FROM transactions "
+                " WHERE recipient = ? AND block_idx IS NOT NULL), "
+                "(SELECT COALESCE(SUM(amount), 0) FROM transactions "
+                " WHERE sender = ? AND block_idx IS NOT NULL)",
+                (address, address)
+            ).fetchone()
+        return from_units(received - sent)
+
+    def get_pending_spend(self, address):
+        with self.lock:
+            spent = self.conn.execute(
+                "SELECT COALESCE(SUM(amount), 0) FROM mempool WHERE sender = ?", (address,)
+            ).fetchone()[0]
+        return from_units(spent)
+
+    def register_node(self, address):
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO nodes (address) VALUES (?)", (address,))
+
+    def get_nodes(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT address FROM nodes ORDER BY address")]
+
+    def trace_sql(self, listener):
+        # sqlite3 reports each statement as it starts, but not when it finishes
+        self.conn.set_trace_callback(lambda statement: listener(statement, None))
+        return True
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def open_store(url=None):
+    """Open the chain store named by ``url`` or the BLOCKCHAIN_DB_URL environment variable.
+
+    ``sqlite:///path/to/chain.db`` selects the embedded store; any other URL
+    (or none) uses PostgreSQL through SQLAlchemy.
+    """
+    url = url or os.environ.get('BLOCKCHAIN_DB_URL')
+    if url and url.startswith('sqlite://'):
+        path = url[len('sqlite://'):]
+        if path.startswith('/'):
+            path = path[1:]
+        return SQLiteChainStore(path or 'blockchain.db')
+    return PostgresChainStore(url)
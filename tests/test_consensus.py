@@ -0,0 +1,51 @@
+import pytest
+import peer_client
+import wire
+from blockchain import Blockchain
+from storage import SQLiteChainStore
+from wallet import Wallet
+
+
+class ChainResponse:
+    status_code = 200
+
+    def __init__(self, chain):
+        self.content = wire.encode_chain(chain)
+        self.headers = {'Content-Type': wire.MIMETYPE}
+
+
+def mine(blockchain, reward_address):
+    last_block = blockchain.get_last_block()
+    return blockchain.create_block(blockchain.proof_of_work(last_block), blockchain.hash(last_block),
+                                   reward_address=reward_address)
+
+
+@pytest.fixture
+def peers(tmp_path, monkeypatch):
+    a = Blockchain(store=SQLiteChainStore(str(tmp_path / 'a.db')))
+    b = Blockchain(store=SQLiteChainStore(str(tmp_path / 'b.db')))
+    b.register_node('http://peer-a:5000')
+    monkeypatch.setattr(peer_client, 'get', lambda url, **kwargs: ChainResponse(a.get_chain()))
+    return a, b
+
+
+def test_adopted_chain_confirms_pending_transactions(peers):
+    a, b = peers
+    wallet = Wallet(scheme='ed25519')
+    mine(a, wallet.address)
+    assert b.resolve_conflicts()
+
+    tx = wallet.create_transaction('a' * 32, 0.5)
+    for blockchain in (a, b):
+        blockchain.new_transaction(sender=tx['sender'], recipient=tx['recipient'], amount=tx['amount'],
+                                   signature=tx['signature'], public_key=tx['public_key'],
+                                   timestamp=tx['timestamp'], scheme=tx['scheme'], version=tx['version'])
+    other = wallet.create_transaction('b' * 32, 0.25)
+    b.new_transaction(sender=other['sender'], recipient=other['recipient'], amount=other['amount'],
+                      signature=other['signature'], public_key=other['public_key'],
+                      timestamp=other['timestamp'], scheme=other['scheme'], version=other['version'])
+    mine(a, wallet.address)
+
+    assert b.resolve_conflicts()
+    assert b.chain_length == a.chain_length
+    assert [tx['recipient'] for tx in b.pending_transactions] == ['b' * 32]
@@ -0,0 +1,50 @@
+import pytest
+import peer_client
+from blockchain import Blockchain
+from gossip import Gossip
+from storage import SQLiteChainStore, PostgresChainStore
+
+
+@pytest.fixture
+def gossip(tmp_path, monkeypatch):
+    blockchain = Blockchain(store=SQLiteChainStore(str(tmp_path / 'chain.db')))
+    blockchain.register_node('http://peer-a:5000')
+    node = Gossip(blockchain, 'http://localhost:5000')
+    node.submitted = []
+    monkeypatch.setattr(node.executor, 'submit', lambda fn, *args: node.submitted.append((fn.__name__, args)))
+    return node
+
+
+def test_inventory_from_unregistered_origin_is_ignored(gossip):
+    inv = {'type': 'block', 'id': 'abc', 'index': 5, 'origin': 'http://attacker:80'}
+    assert gossip.handle_inv(inv) == 'ignored'
+    assert gossip.submitted == []
+
+    # The spoofed announcement must not stop a real peer's announcement of the same id
+    assert gossip.handle_inv(dict(inv, origin='http://peer-a:5000/')) == 'queued'
+    assert gossip.submitted == [('_fetch_blocks', ('http://peer-a:5000', 'abc', 5))]
+
+
+def test_consensus_fallback_is_debounced(gossip, monkeypatch):
+    calls = []
+    monkeypatch.setattr(gossip.blockchain, 'resolve_conflicts', lambda: calls.append(1) or False)
+    for _ in range(5):
+        gossip._resolve()
+    assert len(calls) == 1
+
+    gossip.resolve_interval = 0
+    gossip._resolve()
+    assert len(calls) == 2
+
+
+def test_fetch_threads_return_their_store_session(tmp_path, monkeypatch):
+    blockchain = Blockchain(store=PostgresChainStore(f"sqlite:///{tmp_path / 'orm.db'}"))
+    blockchain.register_node('http://peer-a:5000')
+    node = Gossip(blockchain, 'http://localhost:5000', max_workers=4)
+    monkeypatch.setattr(peer_client, 'get', lambda url, **kwargs: (_ for _ in ()).throw(OSError("offline")))
+
+    futures = [node.executor.submit(node._fetch_transaction, 'http://peer-a:5000', str(i)) for i in range(4)]
+    futures += [node.executor.submit(node._fetch_blocks, 'http://peer-a:5000', 'abc', 5) for _ in range(4)]
+    for future in futures:
+        future.result()
+    assert blockchain.store.pool_status()['checked_out'] == 0
@@ -0,0 +1,62 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from peer_client import PeerClient, transferred_bytes
+
+
+@pytest.fixture
+def unavailable():
+    """Local server that answers every request with 503 and counts hits per path"""
+    hits = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            hits[path] = hits.get(path, 0) + 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+
+
+def test_state_changing_gets_are_not_retried_on_status(unavailable):
+    base, hits = unavailable
+    client = PeerClient(retries=2, backoff_factor=0)
+
+    assert client.get(f"{base}/chain").status_code == 503
+    assert client.get(f"{base}/mine").status_code == 503
+    assert client.get(f"{base}/nodes/resolve", params={'brief': 1}).status_code == 503
+
+    assert hits == {'/chain': 3, '/mine': 1, '/nodes/resolve': 1}
+
+
+def test_transferred_bytes_counts_the_compressed_body():
+    body = gzip.compress(b'{"chain": []}' * 1000)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        response = PeerClient().get(f"http://127.0.0.1:{server.server_port}/chain")
+        assert len(response.content) == 13000
+        assert transferred_bytes(response) == len(body)
+    finally:
+        server.shutdown()
@@ -0,0 +1,20 @@
+import profiling
+from storage import SQLiteChainStore
+
+
+def test_db_span_counts_sql_statements(tmp_path):
+    store = SQLiteChainStore(str(tmp_path / 'chain.db'))
+    assert store.trace_sql(profiling._record_sql)
+    timed = profiling.TimedStore(store)
+
+    profiling._local.trace = {}
+    try:
+        timed.get_balance('a' * 32)
+        timed.get_nodes()
+        trace = profiling._local.trace
+    finally:
+        profiling._local.trace = None
+
+    assert trace['store'][1] == 2
+    assert trace['db'][0] is None and trace['db'][1] >= 2
+    assert 'db;desc="' in profiling.server_timing(trace, 0.001)
@@ -0,0 +1,23 @@
+from blockchain import Blockchain
+from storage import SQLiteChainStore, PostgresChainStore
+
+
+def mine(blockchain):
+    last_block = blockchain.get_last_block()
+    return blockchain.create_block(blockchain.proof_of_work(last_block), blockchain.hash(last_block),
+                                   reward_address='m' * 32)
+
+
+def test_block_hashes_survive_both_backends(tmp_path):
+    sqlite_node = Blockchain(store=SQLiteChainStore(str(tmp_path / 'chain.db')))
+    orm_node = Blockchain(store=PostgresChainStore(f"sqlite:///{tmp_path / 'orm.db'}"))
+    # time() has more digits than a microsecond DateTime keeps
+    sqlite_node.store.replace_chain([dict(sqlite_node.get_last_block(), timestamp=1760000371.2089543)])
+    mine(sqlite_node)
+
+    orm_node.store.replace_chain(sqlite_node.get_chain())
+    assert [orm_node.hash(b) for b in orm_node.get_chain()] == [sqlite_node.hash(b) for b in sqlite_node.get_chain()]
+
+    # The ORM-backed node keeps extending the same chain
+    assert orm_node.add_block(mine(sqlite_node))
+    assert orm_node.hash(orm_node.get_last_block()) == sqlite_node.hash(sqlite_node.get_last_block())
@@ -0,0 +1,118 @@
+import pytest
+from blockchain import Blockchain
+from storage import SQLiteChainStore, PostgresChainStore
+from wallet import Wallet
+import signatures
+
+
+@pytest.fixture
+def funded(tmp_path):
+    blockchain = Blockchain(store=SQLiteChainStore(str(tmp_path / 'chain.db')))
+    wallet = Wallet(scheme='ed25519')
+    last_block = blockchain.get_last_block()
+    blockchain.create_block(blockchain.proof_of_work(last_block), blockchain.hash(last_block),
+                            reward_address=wallet.address)
+    return blockchain, wallet
+
+
+def submit(blockchain, tx):
+    return blockchain.new_transaction(
+        sender=tx['sender'],
+        recipient=tx['recipient'],
+        amount=tx['amount'],
+        signature=tx['signature'],
+        public_key=tx['public_key'],
+        timestamp=tx['timestamp'],
+        scheme=tx.get('scheme'),
+        version=tx.get('version')
+    )
+
+
+def test_replay_with_new_timestamp_is_rejected(funded):
+    blockchain, wallet = funded
+    tx = wallet.create_transaction('a' * 32, 0.5)
+    submit(blockchain, tx)
+
+    with pytest.raises(ValueError):
+        submit(blockchain, dict(tx, timestamp=tx['timestamp'] + 1))
+    with pytest.raises(ValueError):
+        submit(blockchain, tx)
+    assert blockchain.store.pending_count() == 1
+
+
+def test_legacy_replay_with_new_timestamp_is_rejected(funded):
+    blockchain, wallet = funded
+    # Version 1 wallets sign sender, recipient and amount only
+    tx = {'sender': wallet.address, 'recipient': 'a' * 32, 'amount': 0.5, 'timestamp': 1000.0,
+          'public_key': wallet.public_key_pem}
+    tx['signature'] = wallet.sign_transaction(tx).hex()
+    submit(blockchain, tx)
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        submit(blockchain, dict(tx, timestamp=1001.0))
+    assert blockchain.store.pending_count() == 1
+
+
+def mine(blockchain, reward_address):
+    last_block = blockchain.get_last_block()
+    return blockchain.create_block(blockchain.proof_of_work(last_block), blockchain.hash(last_block),
+                                   reward_address=reward_address)
+
+
+@pytest.mark.parametrize('open_store', [
+    lambda path: SQLiteChainStore(str(path / 'chain.db')),
+    lambda path: PostgresChainStore(f"sqlite:///{path / 'orm.db'}"),
+], ids=['sqlite', 'orm'])
+def test_replay_after_mining_is_rejected_by_a_new_instance(tmp_path, open_store):
+    blockchain = Blockchain(store=open_store(tmp_path))
+    wallet = Wallet(scheme='ed25519')
+    mine(blockchain, wallet.address)
+    tx = wallet.create_transaction('a' * 32, 0.5)
+    submit(blockchain, tx)
+    mine(blockchain, wallet.address)
+    assert blockchain.get_balance('a' * 32) == 0.5
+
+    # A restarted node (or another worker) has an empty seen cache
+    restarted = Blockchain(store=open_store(tmp_path))
+    with pytest.raises(ValueError, match="Duplicate"):
+        submit(restarted, tx)
+    assert restarted.store.pending_count() == 0
+    mine(restarted, wallet.address)
+    assert restarted.get_balance('a' * 32) == 0.5
+
+
+def test_pending_spends_count_against_the_balance(funded):
+    blockchain, wallet = funded
+    payouts = wallet.sign_many([('a' * 32, 1.0)] * 5)
+    budget = {}
+    results = []
+    for tx in payouts:
+        try:
+            blockchain.new_transaction(sender=tx['sender'], recipient=tx['recipient'], amount=tx['amount'],
+                                       signature=tx['signature'], public_key=tx['public_key'],
+                                       timestamp=tx['timestamp'], scheme=tx['scheme'],
+                                       version=tx['version'], budget=budget)
+            results.append(True)
+        except ValueError as e:
+            assert "Insufficient balance" in str(e)
+            results.append(False)
+    assert results == [True, False, False, False, False]
+
+    # Outside a batch the mempool is summed again
+    with pytest.raises(ValueError, match="Insufficient balance"):
+        submit(blockchain, wallet.create_transaction('b' * 32, 0.5))
+
+
+def test_create_block_drops_overdrawn_pending_transactions(funded):
+    blockchain, wallet = funded
+    # Admitted concurrently elsewhere: both passed admission against an empty mempool
+    for recipient in ('a' * 32, 'b' * 32):
+        tx = dict(wallet.create_transaction(recipient, 0.75))
+        tx['txid'] = blockchain.transaction_id(tx)
+        blockchain.store.add_transaction(tx)
+
+    mine(blockchain, wallet.address)
+    assert blockchain.get_balance('a' * 32) == 0.75
+    assert blockchain.get_balance('b' * 32) == 0
+    assert blockchain.get_balance(wallet.address) == 1.25
+    assert blockchain.store.pending_count() == 0
@@ -0,0 +1,35 @@
+"""Fixed-point coin amounts.
+
+The stores keep amounts as integer base units (1 coin = 10**8 units), so
+sums in SQL are exact. Blocks, transactions and the API still carry float
+coins. Every amount the chain accepts has at most 8 decimal places, so
+``from_units(to_units(x)) == x`` and block hashes survive the round trip
+through the database.
+"""
+from decimal import Decimal, InvalidOperation
+
+COIN = 10 ** 8
+MAX_UNITS = 2 ** 63 - 1  # BIGINT
+
+
+def to_units(amount):
+    """Float (or numeric string) coins to integer base units, rounded to the nearest unit"""
+    try:
+        units = int((Decimal(repr(float(amount))) * COIN).to_integral_value())
+    except (InvalidOperation, OverflowError) as e:
+        raise ValueError(f"Invalid amount: {amount}") from e
+    if abs(units) > MAX_UNITS:
+        raise ValueError(f"Amount out of range: {amount}")
+    return units
+
+
+def from_units(units):
+    return int(units) / COIN
+
+
+def representable(amount):
+    """True if ``amount`` survives conversion to base units unchanged"""
+    try:
+        return from_units(to_units(amount)) == float(amount)
+    except (TypeError, ValueError):
+        return False
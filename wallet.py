@@ -1,64 +1,103 @@
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives import serialization
+from concurrent.futures import ProcessPoolExecutor
 import json
-import hashlib
 from datetime import datetime
+from chainlog import get_logger
+import profiling
+import signatures
+
+logger = get_logger('wallet')
 
 class Wallet:
-    def __init__(self):
-        # Generate private/public key pair
-        self.private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048
-        )
+    def __init__(self, private_key=None, scheme=None):
+        # Generate a key pair for the requested scheme unless one was supplied
+        if private_key is None:
+            self.scheme = signatures.get_scheme(scheme)
+            private_key = self.scheme.generate()
+        else:
+            self.scheme = signatures.scheme_for_key(private_key)
+        self.private_key = private_key
         self.public_key = self.private_key.public_key()
         
-        # Generate address from public key
-        public_key_bytes = self.public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        self.address = hashlib.sha256(public_key_bytes).hexdigest()[:32]
+        # Generate address from public key (tagged with the scheme prefix)
+        self.address = self.scheme.address(self.public_key)
         
+    @classmethod
+    def from_pool(cls, pool=None):
+        """Create an RSA wallet with a pre-generated key from the background key pool"""
+        import keypool
+        return cls((pool or keypool.default_pool).get())
+
+    @property
+    def public_key_pem(self):
+        return signatures.public_key_pem(self.public_key)
+
     def create_transaction(self, recipient, amount):
-        """Create and sign a transaction"""
-        message_dict = {
+        """Create and sign a transaction ready to post to /transactions/new"""
+        transaction = {
             'sender': self.address,
             'recipient': recipient,
-            'amount': amount
+            'amount': float(amount),
+            'timestamp': datetime.utcnow().timestamp(),
+            'public_key': self.public_key_pem,
+            'scheme': self.scheme.name,
+            'version': signatures.TRANSACTION_VERSION
         }
-        signature = self.private_key.sign(...)
+        transaction['signature'] = self.sign_transaction(transaction).hex()
         return transaction
 
     def sign_transaction(self, transaction):
         """Sign a transaction with private key"""
         try:
-            # Create message from only essential fields in a consistent order
-            message_dict = {
-                'sender': transaction['sender'],
-                'recipient': transaction['recipient'],
-                'amount': float(transaction['amount'])
-            }
+            # Only the essential fields are signed, with sorted keys
+            message = signatures.signing_message(transaction)
+            logger.debug("Signing message: %s", message)
             
-            # Sort keys to ensure consistent ordering for signature
-            message = json.dumps(message_dict, sort_keys=True).encode('utf-8')
-            print(f"\nSigning message:")
-            print(json.dumps(message_dict, sort_keys=True))
-            
-            signature = self.private_key.sign(
-                message,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return signature
+            with profiling.span('crypto'):
+                return self.scheme.sign(self.private_key, message)
             
-        except Exception as e:
-            print(f"Error signing transaction: {str(e)}")
+        except Exception:
+            logger.exception("Error signing transaction")
             raise
 
+    def sign_many(self, payouts, workers=1):
+        """Create and sign a transaction for each (recipient, amount) pair.
+
+        With ``workers`` > 1 the signatures are computed in a process pool.
+        Returns transactions ready for ``peer_client.post_transactions``.
+        """
+        transactions = []
+        for recipient, amount in payouts:
+            transactions.append({
+                'sender': self.address,
+                'recipient': recipient,
+                'amount': float(amount),
+                'timestamp': datetime.utcnow().timestamp(),
+                'public_key': self.public_key_pem,
+                'scheme': self.scheme.name,
+                'version': signatures.TRANSACTION_VERSION
+            })
+        messages = [signatures.signing_message(tx) for tx in transactions]
+
+        if workers > 1 and len(messages) > 1:
+            key_der = self.private_key.private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+            size = -(-len(messages) // workers)
+            chunks = [messages[i:i + size] for i in range(0, len(messages), size)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                signed = [sig for chunk in executor.map(_sign_chunk, [key_der] * len(chunks), chunks)
+                          for sig in chunk]
+        else:
+            with profiling.span('crypto'):
+                signed = [self.scheme.sign(self.private_key, message) for message in messages]
+
+        for transaction, signature in zip(transactions, signed):
+            transaction['signature'] = signature.hex()
+        return transactions
+
     def save_to_file(self, filename):
         """Save wallet to file"""
         data = {
@@ -71,7 +110,8 @@ class Wallet:
                 encoding=serialization.Encoding.PEM,
                 format=serialization.PublicFormat.SubjectPublicKeyInfo
             ).decode(),
-            'address': self.address
+            'address': self.address,
+            'scheme': self.scheme.name
         }
         
         with open(filename, 'w') as f:
@@ -83,24 +123,14 @@ class Wallet:
         with open(filename, 'r') as f:
             data = json.load(f)
             
-        wallet = cls.__new__(cls)
-        wallet.private_key = serialization.load_pem_private_key(
+        private_key = serialization.load_pem_private_key(
             data['private_key'].encode(),
             password=None
         )
-        wallet.public_key = serialization.load_pem_public_key(
-            data['public_key'].encode()
-        )
-        wallet.address = data['address']
+        wallet = cls(private_key)
         
         # Verify address matches public key
-        public_key_bytes = wallet.public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        computed_address = hashlib.sha256(public_key_bytes).hexdigest()[:32]
-        
-        if computed_address != wallet.address:
+        if wallet.address != data['address']:
             raise ValueError("Address does not match public key")
             
         return wallet
@@ -109,43 +139,22 @@ class Wallet:
     def verify_address(address, public_key_pem):
         """Verify that an address matches a public key"""
         try:
-            public_key = serialization.load_pem_public_key(public_key_pem.encode())
-            public_key_bytes = public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            )
-            computed_address = hashlib.sha256(public_key_bytes).hexdigest()[:32]
-            return computed_address == address
+            return signatures.load_public_key(public_key_pem)[2] == address
         except Exception:
             return False
 
     @staticmethod
     def verify_transaction(transaction, signature, public_key_pem):
-        """Verify a transaction signature"""
+        """Verify a transaction signature (raw bytes)"""
         try:
-            # Recreate the same message that was signed
-            message_dict = {
-                'sender': transaction['sender'],
-                'recipient': transaction['recipient'],
-                'amount': float(transaction['amount']),
-                'timestamp': float(transaction['timestamp'])
-            }
-            message = json.dumps(message_dict, sort_keys=True).encode('utf-8')
-            
-            # Load the public key
-            public_key = serialization.load_pem_public_key(public_key_pem.encode())
-            
-            # Verify the signature
-            public_key.verify(
-                signature,
-                message,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return True
+            return signatures.verify_transaction(transaction, signature, public_key_pem)
         except Exception as e:
-            print(f"Signature verification failed: {str(e)}")
-            return False
\ No newline at end of file
+            logger.debug("Signature verification failed: %s", e)
+            return False
+
+
+def _sign_chunk(key_der, messages):
+    """Process pool entry point for Wallet.sign_many"""
+    private_key = serialization.load_der_private_key(key_der, password=None)
+    scheme = signatures.scheme_for_key(private_key)
+    return [scheme.sign(private_key, message) for message in messages]
@@ -0,0 +1,138 @@
+"""Incrementally maintained index of the wallet files in a directory.
+
+Listing wallets used to parse every private key just to print addresses.
+The index stores filename, address, scheme, public-key fingerprint, mtime
+and size in ``.index.json`` next to the wallets. ``refresh()`` stats each
+file and re-reads only new or changed ones. Re-reading parses just the
+public key, never the private key.
+"""
+import hashlib
+import json
+import os
+import threading
+import signatures
+
+INDEX_NAME = '.index.json'
+INDEX_VERSION = 1
+
+
+def read_entry(path):
+    """Index entry for one wallet file; raises ValueError if it is not a consistent wallet"""
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        public_key, scheme, address = signatures.load_public_key(data['public_key'])
+    except (OSError, KeyError, TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Not a wallet file: {str(e)}")
+    except Exception as e:
+        raise ValueError(f"Invalid public key: {str(e)}")
+    if data.get('address') != address:
+        raise ValueError("Address does not match public key")
+    return {
+        'address': address,
+        'scheme': scheme.name,
+        'fingerprint': fingerprint(data['public_key'])
+    }
+
+
+def fingerprint(public_key_pem):
+    return hashlib.sha256(public_key_pem.encode()).hexdigest()
+
+
+class WalletIndex:
+    def __init__(self, directory='wallets', suffix='.pem'):
+        self.directory = directory
+        self.suffix = suffix
+        self.path = os.path.join(directory, INDEX_NAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.entries = data['entries']
+        except (OSError, ValueError, KeyError):
+            self.entries = {}
+
+    def save(self):
+        """Write the index atomically so concurrent readers never see a partial file"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'entries': self.entries}, f)
+        os.replace(tmp, self.path)
+
+    def refresh(self):
+        """Bring the index in line with the directory; returns (added or changed, removed) counts"""
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                return 0, 0
+            seen = set()
+            changed = 0
+            with os.scandir(self.directory) as files:
+                for item in files:
+                    if not item.name.endswith(self.suffix) or not item.is_file():
+                        continue
+                    seen.add(item.name)
+                    stat = item.stat()
+                    entry = self.entries.get(item.name)
+                    if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                        continue
+                    try:
+                        entry = read_entry(item.path)
+                    except ValueError as e:
+                        entry = {'error': str(e)}
+                    entry.update(filename=item.name, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    self.entries[item.name] = entry
+                    changed += 1
+            removed = [name for name in self.entries if name not in seen]
+            for name in removed:
+                del self.entries[name]
+            if changed or removed:
+                self.save()
+            return changed, len(removed)
+
+    def add(self, filename, entry, save=True):
+        """Store ``entry`` (from ``read_entry``) for a file already in the directory.
+
+        Pass ``save=False`` when adding many files and call ``save()`` once at the end.
+        """
+        with self._lock:
+            stat = os.stat(os.path.join(self.directory, filename))
+            self.entries[filename] = dict(entry, filename=filename,
+                                          mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            if save:
+                self.save()
+
+    def record(self, filename, wallet):
+        """Add or update the entry for a wallet just written to ``filename``"""
+        self.add(filename, {
+            'address': wallet.address,
+            'scheme': wallet.scheme.name,
+            'fingerprint': fingerprint(wallet.public_key_pem)
+        })
+
+    def list(self, refresh=True):
+        """Valid wallets sorted by filename"""
+        if refresh:
+            self.refresh()
+        with self._lock:
+            return [
+                {key: entry[key] for key in ('filename', 'address', 'scheme', 'fingerprint')}
+                for name, entry in sorted(self.entries.items()) if 'error' not in entry
+            ]
+
+    def invalid(self):
+        """(filename, error) for files that failed to index"""
+        with self._lock:
+            return [(name, entry['error']) for name, entry in sorted(self.entries.items()) if 'error' in entry]
+
+    def find(self, address):
+        with self._lock:
+            for entry in self.entries.values():
+                if entry.get('address') == address:
+                    return entry
+        return None
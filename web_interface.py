@@ -1,21 +1,38 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for
 from blockchain import Blockchain
 from wallet import Wallet
-import requests
+from wallet_index import WalletIndex
+from units import to_units, from_units
+import peer_client
 import os
 import json
 import traceback
+import chainlog
+import profiling
+import keypool
 
 # Initialize Flask with template folder explicitly
 app = Flask(__name__, 
     template_folder=os.path.abspath('templates'))
 
-# Enable debug mode
-app.debug = True
+# Debug mode (reloader, interactive tracebacks) only when asked for
+app.debug = os.environ.get('FLASK_DEBUG') == '1'
+
+chainlog.configure()
+logger = chainlog.get_logger('web')
+
+# Start filling the wallet key pool before the first wallet is needed
+keypool.default_pool.start()
 
 # Initialize blockchain and wallet
 blockchain = Blockchain()
-wallet = Wallet()
+wallet = Wallet.from_pool()
+wallet_index = WalletIndex('wallets')
+profiling.install(app, blockchain)
+
+@app.teardown_appcontext
+def release_store(exc):
+    blockchain.store.release()
 
 # Add a simple route to test if server is running
 @app.route('/test', methods=['GET'])
@@ -27,26 +44,24 @@ def test():
 
 @app.route('/')
 def index():
-    # Calculate balance
-    balance = 0
+    # Balance is summed in the store in integer base units
+    balance = blockchain.get_balance(wallet.address)
     total_transactions = 0
     blocks_mined = 0
-    mining_rewards = 0
-    
-    for block in blockchain.get_chain():
+    reward_units = 0
+
+    chain = blockchain.get_chain()
+    for block in chain:
         total_transactions += len(block['transactions'])
         for tx in block['transactions']:
-            if tx['recipient'] == wallet.address:
-                balance += tx['amount']
-                if tx['sender'] == "0":  # Mining reward
-                    blocks_mined += 1
-                    mining_rewards += tx['amount']
-            if tx['sender'] == wallet.address:
-                balance -= tx['amount']
+            if tx['recipient'] == wallet.address and tx['sender'] == "0":  # Mining reward
+                blocks_mined += 1
+                reward_units += to_units(tx['amount'])
+    mining_rewards = from_units(reward_units)
 
     return render_template('index.html', 
                          address=wallet.address,
-                         chain=blockchain.get_chain(),
+                         chain=chain,
                          pending=blockchain.pending_transactions,
                          balance=balance,
                          total_transactions=total_transactions,
@@ -74,14 +89,13 @@ def new_transaction():
         except ValueError:
             return jsonify({'error': 'Invalid amount format'}), 400
 
-        print(f"Creating transaction: recipient={recipient}, amount={amount}")
+        logger.debug("Creating transaction: recipient=%s, amount=%s", recipient, amount)
         
         # Create and sign transaction
         try:
             transaction = wallet.create_transaction(recipient, amount)
-            print(f"Transaction created: {transaction}")
         except Exception as e:
-            print(f"Failed to create transaction: {str(e)}")
+            logger.warning("Failed to create transaction: %s", e)
             return jsonify({'error': f'Failed to create transaction: {str(e)}'}), 400
 
         # Send transaction to blockchain
@@ -92,19 +106,21 @@ def new_transaction():
                 recipient=transaction['recipient'],
                 amount=transaction['amount'],
                 signature=transaction['signature'],
-                public_key=transaction['public_key']
+                public_key=transaction['public_key'],
+                timestamp=transaction['timestamp'],
+                scheme=transaction['scheme'],
+                version=transaction['version']
             )
-            print("Transaction added to blockchain successfully")
             return redirect(url_for('index'))
         except ValueError as ve:
-            print(f"Validation error: {str(ve)}")
+            logger.debug("Validation error: %s", ve)
             return jsonify({'error': str(ve)}), 400
         except Exception as e:
-            print(f"Blockchain error: {str(e)}")
+            logger.error("Blockchain error: %s", e)
             return jsonify({'error': str(e)}), 500
 
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.exception("Unexpected error creating transaction")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/mine', methods=['POST'])
@@ -114,27 +130,24 @@ def mine():
         last_block = blockchain.get_last_block()
         proof = blockchain.proof_of_work(last_block)
         
-        # Reward for mining
-        blockchain.new_transaction(
-            sender="0",
-            recipient=wallet.address,
-            amount=1
-        )
-        
-        # Create new block
+        # Create new block with the mining reward
         previous_hash = blockchain.hash(last_block)
-        block = blockchain.create_block(proof, previous_hash)
+        block = blockchain.create_block(proof, previous_hash, reward_address=wallet.address, reward=1)
         
-        print(f"New block mined: {block.index}")
         return redirect(url_for('index'))
     except Exception as e:
-        print(f"Mining error: {str(e)}")
+        logger.error("Mining error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/wallet/new', methods=['POST'])
 def new_wallet():
     global wallet
-    wallet = Wallet()
+    scheme = request.form.get('scheme', 'rsa-pss')
+    try:
+        # RSA keys come from the pre-generated pool; Ed25519 keys are instant
+        wallet = Wallet.from_pool() if scheme == 'rsa-pss' else Wallet(scheme=scheme)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     print(f"New wallet created: {wallet.address}")
     return redirect(url_for('index'))
 
@@ -156,6 +169,7 @@ def save_wallet():
         
         # Save wallet
         wallet.save_to_file(filepath)
+        wallet_index.record(filename, wallet)
         print(f"Wallet saved to {filepath}")
         return jsonify({
             'message': f'Wallet saved to {filename}',
@@ -193,26 +207,11 @@ def load_wallet():
 def list_wallets():
     """List all available wallet files"""
     try:
-        wallet_dir = 'wallets'
-        if not os.path.exists(wallet_dir):
-            os.makedirs(wallet_dir)
-            
-        # Get all .pem files
-        wallet_files = [f for f in os.listdir(wallet_dir) if f.endswith('.pem')]
-        
-        wallets = []
-        for filename in wallet_files:
-            filepath = os.path.join(wallet_dir, filename)
-            try:
-                # Try to load each wallet to get its address
-                temp_wallet = Wallet.load_from_file(filepath)
-                wallets.append({
-                    'filename': filename,
-                    'address': temp_wallet.address
-                })
-            except Exception as e:
-                print(f"Error loading wallet {filename}: {str(e)}")
-                
+        # The index only re-reads wallet files that changed since the last listing
+        wallets = wallet_index.list()
+        for filename, error in wallet_index.invalid():
+            print(f"Error loading wallet {filename}: {error}")
+
         return jsonify({
             'wallets': wallets
         })
@@ -227,14 +226,14 @@ def connect_to_blockchain():
         current_port = request.host.split(":")[-1]
         
         # Connect to main blockchain node
-        response = requests.post(
+        response = peer_client.post(
             'http://localhost:5000/nodes/register',
             json={'nodes': [f'http://localhost:{current_port}']}
         )
         
         if response.status_code == 201:
             # Sync with blockchain
-            sync_response = requests.get('http://localhost:5000/nodes/resolve')
+            sync_response = peer_client.get('http://localhost:5000/nodes/resolve', timeout=30)
             return jsonify({
                 'message': 'Successfully connected to blockchain network',
                 'sync_status': sync_response.json()
@@ -253,7 +252,7 @@ def test_transaction():
         
         # Create a test wallet if none exists
         if not hasattr(test_transaction, 'test_wallet'):
-            test_transaction.test_wallet = Wallet()
+            test_transaction.test_wallet = Wallet.from_pool()
             print(f"Test wallet created: {test_transaction.test_wallet.address}")
         
         # Mine a block to get some coins
@@ -264,7 +263,7 @@ def test_transaction():
             return mine_response
         
         # Create a test transaction
-        recipient = Wallet().address  # Create a new wallet as recipient
+        recipient = Wallet.from_pool().address  # Create a new wallet as recipient
         amount = 0.1  # Small test amount
         
         print(f"\nCreating test transaction:")
@@ -281,7 +280,10 @@ def test_transaction():
             recipient=transaction['recipient'],
             amount=transaction['amount'],
             signature=transaction['signature'],
-            public_key=transaction['public_key']
+            public_key=transaction['public_key'],
+            timestamp=transaction['timestamp'],
+            scheme=transaction['scheme'],
+            version=transaction['version']
         )
         
         print("\nTest transaction added successfully")
@@ -352,8 +354,8 @@ if __name__ == '__main__':
         port = int(os.environ.get('PORT', 5001))
         print(f"\nStarting server on port {port}")
         
-        # Run with debug mode
-        app.run(host='0.0.0.0', port=port, debug=True)
+        # Development server; use serve.py for production
+        app.run(host='0.0.0.0', port=port, debug=app.debug)
     except Exception as e:
         print(f"Error starting server: {str(e)}")
         traceback.print_exc() 
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""Compact binary wire format for node-to-node traffic.
+
+JSON stays the default. A client that sends ``Accept: application/x-cryptochain``
+gets fixed-width binary frames instead: raw 16-byte addresses, raw 32-byte
+hashes, raw signatures and DER public keys, with no repeated field names.
+"""
+import base64
+import hashlib
+import struct
+
+MIMETYPE = 'application/x-cryptochain'
+ACCEPT_BINARY = {'Accept': f'{MIMETYPE}, application/json;q=0.5'}
+
+MAGIC = b'CC'
+VERSION = 1
+KIND_CHAIN = 1
+KIND_TRANSACTION = 2
+KIND_TXID = 3
+
+ADDRESS_SIZE = 16
+HASH_SIZE = 32
+
+_HEADER = struct.Struct('<2sBB')
+_BLOCK = struct.Struct('<IdQI')  # index, timestamp, proof, transaction count
+_AMOUNT = struct.Struct('<d')
+_TX_TIME = struct.Struct('<d')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+
+# Tags for values that are usually fixed-width hex but may be free-form
+# (the "0" mining-reward sender, the genesis previous_hash, test names).
+# Ed25519 addresses are "ed" + 32 hex chars and travel as raw bytes too.
+_RAW = 0
+_TEXT = 1
+_RAW_ED = 2
+ED_PREFIX = 'ed'
+
+
+class WireError(ValueError):
+    pass
+
+
+class _Writer:
+    def __init__(self, kind):
+        self.buf = bytearray(_HEADER.pack(MAGIC, VERSION, kind))
+
+    def pack(self, fmt, *values):
+        self.buf += fmt.pack(*values)
+
+    def blob(self, data):
+        self.buf += _U16.pack(len(data))
+        self.buf += data
+
+    def text(self, value):
+        self.blob((value or '').encode('utf-8'))
+
+    def hex_field(self, value, size):
+        tag, digits = _RAW, value
+        if isinstance(value, str) and len(value) == size * 2 + len(ED_PREFIX) and value.startswith(ED_PREFIX):
+            tag, digits = _RAW_ED, value[len(ED_PREFIX):]
+        if isinstance(digits, str) and len(digits) == size * 2 and digits == digits.lower():
+            try:
+                raw = bytes.fromhex(digits)
+            except ValueError:
+                raw = None
+            if raw is not None:
+                self.buf.append(tag)
+                self.buf += raw
+                return
+        self.buf.append(_TEXT)
+        self.text(value)
+
+
+class _Reader:
+    def __init__(self, data, kind):
+        self.view = memoryview(data)
+        self.pos = 0
+        try:
+            magic, version, found = self.unpack(_HEADER)
+        except struct.error:
+            raise WireError("Truncated frame")
+        if magic != MAGIC or version != VERSION:
+            raise WireError("Not a cryptochain frame")
+        if found != kind:
+            raise WireError(f"Expected frame kind {kind}, got {found}")
+
+    def unpack(self, fmt):
+        values = fmt.unpack_from(self.view, self.pos)
+        self.pos += fmt.size
+        return values
+
+    def take(self, size):
+        if self.pos + size > len(self.view):
+            raise WireError("Truncated frame")
+        data = bytes(self.view[self.pos:self.pos + size])
+        self.pos += size
+        return data
+
+    def blob(self):
+        (size,) = self.unpack(_U16)
+        return self.take(size)
+
+    def text(self):
+        return self.blob().decode('utf-8')
+
+    def hex_field(self, size):
+        tag = self.take(1)[0]
+        if tag == _RAW:
+            return self.take(size).hex()
+        if tag == _RAW_ED:
+            return ED_PREFIX + self.take(size).hex()
+        if tag == _TEXT:
+            return self.text()
+        raise WireError(f"Unknown field tag {tag}")
+
+
+def _pem_to_der(pem):
+    lines = [line for line in pem.strip().splitlines() if not line.startswith('-----')]
+    return base64.b64decode(''.join(lines))
+
+
+def _der_to_pem(der):
+    encoded = base64.b64encode(der).decode()
+    body = '\n'.join(encoded[i:i + 64] for i in range(0, len(encoded), 64))
+    return f"-----BEGIN PUBLIC KEY-----\n{body}\n-----END PUBLIC KEY-----\n"
+
+
+def _write_block(w, block):
+    w.pack(_BLOCK, block['index'], float(block['timestamp']), block['proof'],
+           len(block['transactions']))
+    w.hex_field(block['previous_hash'], HASH_SIZE)
+    for tx in block['transactions']:
+        w.hex_field(tx['sender'], ADDRESS_SIZE)
+        w.hex_field(tx['recipient'], ADDRESS_SIZE)
+        w.pack(_AMOUNT, float(tx['amount']))
+
+
+def _read_block(r):
+    index, timestamp, proof, tx_count = r.unpack(_BLOCK)
+    block = {
+        'index': index,
+        'timestamp': timestamp,
+        'proof': proof,
+        'previous_hash': r.hex_field(HASH_SIZE),
+        'transactions': []
+    }
+    for _ in range(tx_count):
+        sender = r.hex_field(ADDRESS_SIZE)
+        recipient = r.hex_field(ADDRESS_SIZE)
+        (amount,) = r.unpack(_AMOUNT)
+        block['transactions'].append({
+            'sender': sender,
+            'recipient': recipient,
+            'amount': amount
+        })
+    return block
+
+
+def encode_chain(chain, message=None):
+    """Encode a list of blocks (and an optional status message) as one frame"""
+    w = _Writer(KIND_CHAIN)
+    w.text(message)
+    w.pack(_U32, len(chain))
+    for block in chain:
+        _write_block(w, block)
+    return bytes(w.buf)
+
+
+def decode_chain(data):
+    """Decode a chain frame into the same dict shape as the JSON ``/chain`` response"""
+    r = _Reader(data, KIND_CHAIN)
+    try:
+        message = r.text()
+        (count,) = r.unpack(_U32)
+        chain = [_read_block(r) for _ in range(count)]
+    except struct.error:
+        raise WireError("Truncated frame")
+    result = {'chain': chain, 'length': len(chain)}
+    if message:
+        result['message'] = message
+    return result
+
+
+def _write_fields(w, transaction):
+    w.hex_field(transaction['sender'], ADDRESS_SIZE)
+    w.hex_field(transaction['recipient'], ADDRESS_SIZE)
+    w.pack(_AMOUNT, float(transaction['amount']))
+    w.pack(_TX_TIME, float(transaction.get('timestamp') or 0))
+    signature = transaction.get('signature')
+    w.blob(bytes.fromhex(signature) if signature else b'')
+
+
+def transaction_bytes(transaction):
+    """Canonical binary form of a transaction's signed content plus its signature.
+
+    Only fields covered by the signature (see ``signatures.signing_message``)
+    are included, so a replay with an altered unsigned field keeps the same
+    id. Version 1 signs no timestamp, so its timestamp is left out. The scheme
+    is implied by the sender address prefix.
+    """
+    version = int(transaction.get('version') or 1)
+    w = _Writer(KIND_TXID)
+    w.buf.append(version)
+    w.hex_field(transaction['sender'], ADDRESS_SIZE)
+    w.hex_field(transaction['recipient'], ADDRESS_SIZE)
+    w.pack(_AMOUNT, float(transaction['amount']))
+    if version >= 2:
+        w.pack(_TX_TIME, float(transaction['timestamp']))
+    signature = transaction.get('signature')
+    w.blob(bytes.fromhex(signature) if signature else b'')
+    return bytes(w.buf)
+
+
+def transaction_id(transaction):
+    """Hex SHA-256 of ``transaction_bytes``; the id used by the mempool, dedup and gossip"""
+    return hashlib.sha256(transaction_bytes(transaction)).hexdigest()
+
+
+def encode_transaction(transaction):
+    """Encode a signed transaction as submitted to ``/transactions/new``"""
+    w = _Writer(KIND_TRANSACTION)
+    _write_fields(w, transaction)
+    public_key = transaction.get('public_key')
+    w.blob(_pem_to_der(public_key) if public_key else b'')
+    # Trailing transaction version; frames from older clients end before it
+    w.buf.append(int(transaction.get('version') or 1))
+    return bytes(w.buf)
+
+
+def decode_transaction(data):
+    """Decode a transaction frame back into the JSON field layout"""
+    r = _Reader(data, KIND_TRANSACTION)
+    try:
+        sender = r.hex_field(ADDRESS_SIZE)
+        recipient = r.hex_field(ADDRESS_SIZE)
+        (amount,) = r.unpack(_AMOUNT)
+        (timestamp,) = r.unpack(_TX_TIME)
+        signature = r.blob()
+        public_key = r.blob()
+        version = r.take(1)[0] if r.pos < len(r.view) else 1
+    except struct.error:
+        raise WireError("Truncated frame")
+    return {
+        'sender': sender,
+        'recipient': recipient,
+        'amount': amount,
+        'timestamp': timestamp,
+        'signature': signature.hex() if signature else None,
+        'public_key': _der_to_pem(public_key) if public_key else None,
+        'version': version
+    }
+
+
+def is_binary(content_type):
+    return bool(content_type) and content_type.split(';')[0].strip() == MIMETYPE
+
+
+def decode_response(response):
+    """Decode a ``requests`` response carrying a chain in either JSON or binary form"""
+    if is_binary(response.headers.get('Content-Type')):
+        return decode_chain(response.content)
+    return response.json()